@@ -0,0 +1,207 @@
+"""Асинхронные представления для самых частых запросов чтения.
+
+Подключаются только в ASGI через foodgram.asgi_urls. Запросы, которые
+здесь не обслуживаются (запись, редкие параметры, ошибки
+аутентификации и валидации), передаются синхронным представлениям
+из foodgram.urls, поэтому ответы в обоих режимах совпадают.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.shortcuts import redirect
+from django.urls import resolve
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from . import fragments
+from .conditional import (
+    arecipe_list_etag, arecipe_validators, not_modified, set_validators
+)
+from .filters import RecipeFilter
+from .mixins import etag_matches
+from .paginators import LimitPageNumberPaginator
+from .renderers import ORJSONRenderer
+from .serializers import IngredientSerializer, RecipeGetSerializer
+from .views import IngredientViewSet, TagViewSet
+from recipes import short_links
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Recipe, ShortLink
+from recipes.versions import aget_version
+
+SYNC_URLCONF = 'foodgram.urls'
+READ_METHODS = ('GET', 'HEAD')
+RECIPE_LIST_PARAMS = {'page', 'limit', 'cursor', *RecipeFilter.base_filters}
+
+
+class Fallback(Exception):
+    """Запрос обслуживается синхронным представлением."""
+
+
+async def sync_view(request):
+    match = resolve(request.path_info, urlconf=SYNC_URLCONF)
+    return await sync_to_async(match.func)(
+        request, *match.args, **match.kwargs
+    )
+
+
+def json_response(data, **kwargs):
+    return HttpResponse(
+        ORJSONRenderer().render(data), content_type='application/json',
+        **kwargs
+    )
+
+
+async def authenticate(request):
+    """Пользователь по заголовку Token, как в TokenAuthentication.
+
+    Неверный заголовок или токен обрабатывает синхронный путь.
+    """
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        return AnonymousUser()
+    if len(auth) != 2:
+        raise Fallback
+    try:
+        token = await Token.objects.select_related('user').aget(
+            key=auth[1].decode()
+        )
+    except (Token.DoesNotExist, UnicodeError):
+        raise Fallback
+    if not token.user.is_active:
+        raise Fallback
+    return token.user
+
+
+def read_view(view):
+    """GET и HEAD обслуживает view, остальное синхронные представления."""
+    @csrf_exempt
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in READ_METHODS
+            or 'text/html' in request.headers.get('Accept', '')
+        ):
+            return await sync_view(request)
+        try:
+            drf_request = Request(request)
+            drf_request.user = await authenticate(request)
+            response = await view(drf_request, *args, **kwargs)
+        except Fallback:
+            return await sync_view(request)
+        except APIException as exc:
+            response = json_response(
+                {'detail': exc.detail}, status=exc.status_code
+            )
+        # Как в APIView.finalize_response.
+        patch_vary_headers(response, ('Accept',))
+        return response
+    return wrapper
+
+
+async def cached_list(request, view_class):
+    """Список из кэша CachedListMixin; промах заполняет синхронный путь."""
+    version = await aget_version(view_class.cache_version_name)
+    etag = view_class.version_etag(version)
+    headers = {'ETag': etag, 'Cache-Control': view_class.cache_control}
+    if etag_matches(request, etag):
+        return HttpResponseNotModified(headers=headers)
+    data = view_class.fresh_data(version)
+    if data is None:
+        raise Fallback
+    return json_response(data, headers=headers)
+
+
+def filter_recipes(request, queryset):
+    """Выборка RecipeFilter, как в RecipeViewSet.
+
+    Ошибки валидации фильтров возвращает синхронный путь.
+    """
+    if set(request.query_params) - RECIPE_LIST_PARAMS:
+        raise Fallback
+    filterset = RecipeFilter(
+        request.query_params, queryset=queryset, request=request
+    )
+    if not filterset.is_valid():
+        raise Fallback
+    return filterset.qs
+
+
+@read_view
+async def recipe_list(request):
+    # Форма фильтров проверяет теги запросом к БД.
+    queryset = await sync_to_async(filter_recipes)(
+        request,
+        Recipe.objects.with_related().with_user_flags(request.user)
+    )
+    paginator = LimitPageNumberPaginator()
+    etag = await arecipe_list_etag(
+        paginator.window(queryset, request), request
+    )
+    response = not_modified(request, etag, None)
+    if response is None:
+        page = await paginator.apaginate_queryset(queryset, request)
+        data = await fragments.arender(
+            RecipeGetSerializer(context={'request': request}), page
+        )
+        response = json_response(
+            paginator.get_paginated_response(data).data
+        )
+    return set_validators(response, etag, None)
+
+
+@read_view
+async def recipe_detail(request, pk):
+    if request.query_params:
+        raise Fallback
+    queryset = Recipe.objects.with_related().with_user_flags(request.user)
+    etag, last_modified = await arecipe_validators(queryset, request, pk)
+    if etag is None:
+        raise Fallback
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        try:
+            recipe = await queryset.aget(pk=pk)
+        except Recipe.DoesNotExist:
+            raise Fallback
+        data = await fragments.arender(
+            RecipeGetSerializer(context={'request': request}), [recipe]
+        )
+        response = json_response(data[0])
+    return set_validators(response, etag, last_modified)
+
+
+@read_view
+async def ingredient_list(request):
+    """Автодополнение по индексу в памяти или весь справочник из кэша."""
+    name = request.query_params.get('name')
+    if not name:
+        if request.query_params:
+            raise Fallback
+        return await cached_list(request, IngredientViewSet)
+    limit = request.query_params.get('limit')
+    ingredients = await ingredient_index.asearch(
+        name, limit=int(limit) if limit and limit.isdigit() else None
+    )
+    return json_response(IngredientSerializer(ingredients, many=True).data)
+
+
+@read_view
+async def tag_list(request):
+    if request.query_params:
+        raise Fallback
+    return await cached_list(request, TagViewSet)
+
+
+async def get_full_link(request, short_link):
+    """Получение оригинальной ссылки."""
+    try:
+        recipe_id = await short_links.aresolve(short_link)
+    except ShortLink.DoesNotExist:
+        raise Http404
+    return redirect(f'/recipes/{recipe_id}')
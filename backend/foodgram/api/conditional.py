@@ -0,0 +1,117 @@
+"""Валидаторы условных GET-запросов для рецептов."""
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscriber, User
+
+USER_STATE_MODELS = (
+    ('favorite', Favorite),
+    ('cart', ShoppingCart),
+    ('subscriber', Subscriber),
+)
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(
+        '|'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def user_state_query(user):
+    """Количество и последний id избранного, корзины и подписок.
+
+    Строки этих таблиц только добавляются и удаляются, поэтому пара
+    (count, max id) меняется при любом изменении флагов пользователя.
+    """
+    annotations = {}
+    for name, model in USER_STATE_MODELS:
+        rows = model.objects.filter(
+            user=OuterRef('pk')
+        ).order_by().values('user')
+        annotations[f'{name}_count'] = Subquery(
+            rows.annotate(value=Count('pk')).values('value')
+        )
+        annotations[f'{name}_last'] = Subquery(
+            rows.annotate(value=Max('pk')).values('value')
+        )
+    return User.objects.filter(pk=user.pk).annotate(
+        **annotations
+    ).values_list(*annotations)
+
+
+def user_state(user):
+    if user.is_anonymous:
+        return None
+    return tuple(user_state_query(user).get())
+
+
+async def auser_state(user):
+    if user.is_anonymous:
+        return None
+    return tuple(await user_state_query(user).aget())
+
+
+FEED = {'last': Max('updated_at'), 'total': Count('pk')}
+RECIPE_FIELDS = (
+    'updated_at', 'is_favorited', 'is_in_shopping_cart', 'author_is_subscribed'
+)
+
+
+def recipe_list_etag(queryset, request):
+    """ETag ленты по MAX(updated_at) и количеству рецептов."""
+    feed = queryset.aggregate(**FEED)
+    return make_etag(
+        request.get_full_path(), request.user.pk, feed['last'],
+        feed['total'], user_state(request.user)
+    )
+
+
+async def arecipe_list_etag(queryset, request):
+    feed = await queryset.aaggregate(**FEED)
+    return make_etag(
+        request.get_full_path(), request.user.pk, feed['last'],
+        feed['total'], await auser_state(request.user)
+    )
+
+
+def recipe_etag(row, request):
+    """ETag и дата изменения рецепта с учетом флагов пользователя."""
+    if row is None:
+        return None, None
+    etag = make_etag(request.user.pk, *row.values())
+    # Флаги пользователя не меняют updated_at, поэтому Last-Modified
+    # отдается только анонимным пользователям.
+    last_modified = row['updated_at'] if request.user.is_anonymous else None
+    return etag, last_modified
+
+
+def recipe_validators(queryset, request, pk):
+    row = queryset.filter(pk=pk).values(*RECIPE_FIELDS).first()
+    return recipe_etag(row, request)
+
+
+async def arecipe_validators(queryset, request, pk):
+    row = await queryset.filter(pk=pk).values(*RECIPE_FIELDS).afirst()
+    return recipe_etag(row, request)
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304/412 по валидаторам или None."""
+    timestamp = last_modified and int(last_modified.timestamp())
+    return get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,154 @@
+"""Представления для чтения без сериализаторов DRF.
+
+Словари собираются из атрибутов объектов страницы и из строк values()
+для связанных тегов и ингредиентов. Вывод совпадает с
+RecipeGetSerializer, CustomUserSerializer, SubscriptionSerializer
+и ShortRecipeSerializer, что проверяет команда benchmark_serializers.
+"""
+from django.core.files.storage import default_storage
+from django.db.models import prefetch_related_objects
+
+from recipes.models import Ingredient, RecipeIngredient, Tag
+from recipes.renditions import stored_rendition_url
+from users.models import Subscriber
+
+
+def absolute(url, request):
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def file_url(field_file, request):
+    """Как ImageField.to_representation."""
+    if not field_file:
+        return None
+    return absolute(default_storage.url(field_file.name), request)
+
+
+def rendition_url(field_file, size, request):
+    """Как RenditionField.to_representation."""
+    if not field_file:
+        return None
+    return absolute(
+        stored_rendition_url(default_storage, field_file.name, size), request
+    )
+
+
+def user_data(user, is_subscribed, request):
+    return {
+        'email': user.email,
+        'id': user.pk,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_subscribed': is_subscribed,
+        'avatar': file_url(user.avatar, request),
+        'avatar_small': rendition_url(user.avatar, 'avatar', request),
+    }
+
+
+def subscribed_ids(user, author_ids):
+    if user.is_anonymous or not author_ids:
+        return set()
+    return set(Subscriber.objects.filter(
+        user=user, author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+
+
+def users_data(users, request):
+    """Страница пользователей, подписки проверяются одним запросом."""
+    subscribed = subscribed_ids(request.user, [user.pk for user in users])
+    return [
+        user_data(user, user.pk in subscribed, request) for user in users
+    ]
+
+
+def short_recipe_data(recipe, request):
+    return {
+        'id': recipe.pk,
+        'name': recipe.name,
+        'image': file_url(recipe.image, request),
+        'image_card': rendition_url(recipe.image, 'card', request),
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def subscriptions_data(authors, request):
+    """Подписки с рецептами из Prefetch(..., to_attr='short_recipes').
+
+    Как и в SubscriptionSerializer, ссылки в рецептах относительные.
+    """
+    result = []
+    for author in authors:
+        data = user_data(author, author.is_subscribed, request)
+        avatar, avatar_small = data.pop('avatar'), data.pop('avatar_small')
+        data['recipes'] = [
+            short_recipe_data(recipe, None) for recipe in author.short_recipes
+        ]
+        data['recipes_count'] = author.recipes_count
+        data['avatar'], data['avatar_small'] = avatar, avatar_small
+        result.append(data)
+    return result
+
+
+def recipe_tags(recipe_ids):
+    """Теги рецептов тем же запросом, что и prefetch_related('tags')."""
+    tags = {}
+    for row in Tag.objects.filter(recipes__in=recipe_ids).values(
+        'recipes', 'id', 'name', 'slug'
+    ):
+        tags.setdefault(row.pop('recipes'), []).append(row)
+    return tags
+
+
+def recipe_ingredients(recipe_ids):
+    """Состав рецептов в порядке prefetch_related('recipe_ingredients')."""
+    rows = list(RecipeIngredient.objects.filter(
+        recipe__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id', 'amount'))
+    names = {
+        pk: (name, unit) for pk, name, unit in Ingredient.objects.filter(
+            pk__in={ingredient_id for _, ingredient_id, _ in rows}
+        ).values_list('pk', 'name', 'measurement_unit')
+    }
+    ingredients = {}
+    for recipe_id, ingredient_id, amount in rows:
+        name, unit = names[ingredient_id]
+        ingredients.setdefault(recipe_id, []).append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def recipes_data(recipes, request):
+    """Общая часть RecipeGetSerializer: личные флаги равны False."""
+    prefetch_related_objects(recipes, 'author')
+    ids = [recipe.pk for recipe in recipes]
+    tags = recipe_tags(ids)
+    ingredients = recipe_ingredients(ids)
+    authors = {}
+    result = []
+    for recipe in recipes:
+        if recipe.author_id not in authors:
+            authors[recipe.author_id] = user_data(
+                recipe.author, False, request
+            )
+        result.append({
+            'id': recipe.pk,
+            'tags': tags.get(recipe.pk, []),
+            'author': authors[recipe.author_id],
+            'ingredients': ingredients.get(recipe.pk, []),
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': recipe.name,
+            'image': file_url(recipe.image, request),
+            'image_card': rendition_url(recipe.image, 'card', request),
+            'image_detail': rendition_url(recipe.image, 'detail', request),
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        })
+    return result
@@ -3,6 +3,8 @@ import base64
 from django.core.files.base import ContentFile
 from rest_framework import serializers
 
+from recipes.renditions import rendition_url
+
 
 class Base64ImageField(serializers.ImageField):
     """Вспомогательный сериализатор для загрузки изображений."""
@@ -13,3 +15,20 @@ class Base64ImageField(serializers.ImageField):
             ext = format.split('/')[-1]
             data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
         return super().to_internal_value(data)
+
+
+class RenditionField(serializers.ReadOnlyField):
+    """URL уменьшенной копии изображения или оригинала."""
+
+    def __init__(self, size, **kwargs):
+        self.size = size
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = rendition_url(value, self.size)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
@@ -0,0 +1,110 @@
+"""Кэш общей для всех пользователей части представления рецепта.
+
+Фрагмент хранится по id рецепта и его updated_at. Сигналы
+recipes.signals обновляют updated_at при изменении рецепта, состава,
+тегов, справочников и профиля автора, поэтому устаревший фрагмент
+перестает читаться и вытесняется по TTL. Флаги пользователя
+подставляются в каждый ответ.
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from prometheus_client import Counter
+
+from recipes.models import Recipe
+
+# Меняется при изменении формата представления рецепта.
+FRAGMENT_FORMAT = 1
+USER_FLAGS = ('is_favorited', 'is_in_shopping_cart', 'author_is_subscribed')
+
+FRAGMENTS = Counter(
+    'foodgram_recipe_fragments', 'Фрагменты рецептов из кэша и собранные',
+    ('result',)
+)
+
+cache = caches['fragments']
+
+
+def fragment_key(serializer, recipe):
+    # Ссылки на изображения абсолютные и зависят от адреса запроса.
+    request = serializer.context.get('request')
+    base = request.build_absolute_uri('/') if request is not None else ''
+    return (
+        f'recipe:{FRAGMENT_FORMAT}:{type(serializer).__name__}:{recipe.pk}:'
+        f'{recipe.updated_at.timestamp()}:{base}'
+    )
+
+
+def load_user_flags(recipes, user):
+    """Флаги из аннотаций with_user_flags или одним запросом на страницу."""
+    missing = [
+        recipe for recipe in recipes if not hasattr(recipe, USER_FLAGS[0])
+    ]
+    if not missing:
+        return
+    flags = {}
+    if not user.is_anonymous:
+        flags = {
+            pk: values for pk, *values in Recipe.objects.filter(
+                pk__in=[recipe.pk for recipe in missing]
+            ).with_user_flags(user).values_list('pk', *USER_FLAGS)
+        }
+    for recipe in missing:
+        values = flags.get(recipe.pk, [False] * len(USER_FLAGS))
+        for name, value in zip(USER_FLAGS, values):
+            setattr(recipe, name, value)
+
+
+def lookup(serializer, recipes):
+    """Ключи, найденные фрагменты и рецепты без фрагмента."""
+    keys = {recipe.pk: fragment_key(serializer, recipe) for recipe in recipes}
+    fragments = cache.get_many(keys.values())
+    missing = [
+        recipe for recipe in recipes if keys[recipe.pk] not in fragments
+    ]
+    FRAGMENTS.labels('hit').inc(len(recipes) - len(missing))
+    FRAGMENTS.labels('miss').inc(len(missing))
+    return keys, fragments, missing
+
+
+def build(serializer, keys, fragments, missing):
+    built = dict(zip(
+        (keys[recipe.pk] for recipe in missing),
+        serializer.shared_representations(missing)
+    ))
+    cache.set_many(built)
+    fragments.update(built)
+
+
+def merge(serializer, keys, fragments, recipes):
+    return [
+        serializer.overlay(fragments[keys[recipe.pk]], recipe)
+        for recipe in recipes
+    ]
+
+
+def render(serializer, recipes):
+    """Представления рецептов из фрагментов и флагов пользователя.
+
+    Теги и состав загружаются только для рецептов без фрагмента.
+    """
+    if not recipes:
+        return []
+    load_user_flags(recipes, serializer.context['request'].user)
+    keys, fragments, missing = lookup(serializer, recipes)
+    if missing:
+        build(serializer, keys, fragments, missing)
+    return merge(serializer, keys, fragments, recipes)
+
+
+async def arender(serializer, recipes):
+    """render для асинхронных представлений, запросы идут в потоке."""
+    if not recipes:
+        return []
+    if not all(hasattr(recipe, USER_FLAGS[0]) for recipe in recipes):
+        await sync_to_async(load_user_flags)(
+            recipes, serializer.context['request'].user
+        )
+    keys, fragments, missing = lookup(serializer, recipes)
+    if missing:
+        await sync_to_async(build)(serializer, keys, fragments, missing)
+    return merge(serializer, keys, fragments, recipes)
@@ -0,0 +1,115 @@
+"""Метрики Prometheus для запросов к приложению.
+
+При запуске под gunicorn значения пишутся в файлы каталога
+PROMETHEUS_MULTIPROC_DIR и суммируются по всем воркерам при выдаче
+/metrics.
+"""
+import os
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess
+)
+
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float('inf')
+)
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds', 'Время обработки запроса',
+    ('handler', 'method')
+)
+DB_DURATION = Histogram(
+    'foodgram_request_db_seconds', 'Время SQL-запросов за запрос',
+    ('handler', 'method')
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes', 'Размер тела ответа',
+    ('handler', 'method'), buckets=SIZE_BUCKETS
+)
+ERRORS = Counter(
+    'foodgram_request_errors_total', 'Ответы с кодом 4xx и 5xx',
+    ('handler', 'method', 'status')
+)
+
+
+def handler_name(view_func, method):
+    """Имя обработчика: RecipeViewSet.list, short_link, ..."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return view_func.__name__
+    actions = getattr(view_func, 'actions', None)
+    if actions and method.lower() in actions:
+        return f'{cls.__name__}.{actions[method.lower()]}'
+    return cls.__name__
+
+
+class DbTimer:
+    """Суммарное время SQL-запросов."""
+
+    def __init__(self):
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Задержка, время БД, размер ответа и ошибки по обработчикам."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = DbTimer()
+        started = perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        return self.observe(request, response, started, timer)
+
+    async def __acall__(self, request):
+        timer = DbTimer()
+        started = perf_counter()
+        with connection.execute_wrapper(timer):
+            response = await self.get_response(request)
+        return self.observe(request, response, started, timer)
+
+    def observe(self, request, response, started, timer):
+        handler = getattr(request, 'metrics_handler', 'unmatched')
+        labels = (handler, request.method)
+        REQUEST_DURATION.labels(*labels).observe(perf_counter() - started)
+        DB_DURATION.labels(*labels).observe(timer.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+        if response.status_code >= 400:
+            ERRORS.labels(*labels, str(response.status_code)).inc()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_handler = handler_name(view_func, request.method)
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus."""
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,57 @@
+from threading import Lock
+
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.versions import get_version
+
+
+def etag_matches(request, etag):
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    return etag in if_none_match or '*' in if_none_match
+
+
+class CachedListMixin:
+    """Кэширует список в памяти процесса до смены версии данных.
+
+    Версия читается из БД одним запросом по первичному ключу, поэтому
+    изменения из других процессов видны сразу. Строгий ETag строится из
+    версии, и If-None-Match с совпадающим тегом получает 304 без выборки
+    списка и сериализаторов, даже если кэш процесса пуст.
+    """
+
+    cache_version_name = None
+    cache_control = 'public, no-cache'
+
+    _cache = {}
+    _lock = Lock()
+
+    @classmethod
+    def version_etag(cls, version):
+        return f'"{cls.cache_version_name}-{version}"'
+
+    @classmethod
+    def fresh_data(cls, version):
+        """Данные из кэша, если версия совпадает, иначе None."""
+        entry = cls._cache.get(cls.cache_version_name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        return None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        version = get_version(self.cache_version_name)
+        etag = self.version_etag(version)
+        headers = {'ETag': etag, 'Cache-Control': self.cache_control}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        data = self.fresh_data(version)
+        if data is None:
+            # Список без ReturnList: кэш не держит ссылку на сериализатор.
+            data = list(super().list(request, *args, **kwargs).data)
+            with self._lock:
+                self._cache[self.cache_version_name] = (version, data)
+        return Response(data, headers=headers)
@@ -1,8 +1,172 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+from base64 import b64decode, b64encode
+from urllib.parse import parse_qs, urlencode
+
+from django.core.paginator import InvalidPage
+from django.db.models import QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class IdCursorPaginator(BasePagination):
+    """Постраничный вывод по курсору на id, без OFFSET и COUNT(*).
+
+    Курсор хранит id крайней записи страницы и направление, поэтому
+    любая страница читается по индексу первичного ключа. Формат курсора
+    совпадает с CursorPagination из DRF.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+
+    @staticmethod
+    def supports(queryset):
+        """Курсор подходит только для выборок, упорядоченных по -id.
+
+        Результаты поиска, например, отсортированы по релевантности.
+        """
+        query = queryset.query
+        # Порядок выбирается как в SQLCompiler.get_order_by.
+        ordering = (
+            query.extra_order_by or query.order_by
+            or (query.default_ordering and queryset.model._meta.ordering)
+        )
+        return tuple(ordering or ()) in (('-id',), ('-pk',))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            tokens = parse_qs(b64decode(encoded.encode('ascii')).decode())
+            return int(tokens['p'][0]), bool(int(tokens.get('r', [0])[0]))
+        except (KeyError, ValueError, binascii.Error, UnicodeError):
+            raise NotFound('Неверный курсор')
+
+    def encode_cursor(self, position, reverse=False):
+        tokens = {'p': position}
+        if reverse:
+            tokens['r'] = 1
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            b64encode(urlencode(tokens).encode()).decode()
+        )
+
+    def window(self, queryset, request):
+        """Записи страницы и одна следующая, по индексу на id."""
+        position, reverse = self.decode_cursor(request)
+        if reverse:
+            queryset = queryset.order_by('id')
+            if position is not None:
+                queryset = queryset.filter(id__gt=position)
+        else:
+            queryset = queryset.order_by('-id')
+            if position is not None:
+                queryset = queryset.filter(id__lt=position)
+        return queryset[:self.get_page_size(request) + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.make_page(list(self.window(queryset, request)), request)
+
+    async def apaginate_queryset(self, queryset, request):
+        window = self.window(queryset, request).aiterator(
+            chunk_size=self.get_page_size(request) + 1
+        )
+        return self.make_page([obj async for obj in window], request)
+
+    def make_page(self, results, request):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        page = results[:page_size]
+        has_more = len(results) > page_size
+        if reverse:
+            page.reverse()
+        has_next = has_more if not reverse else position is not None
+        has_previous = has_more if reverse else position is not None
+        self.next = self.previous = None
+        if page and has_next:
+            self.next = self.encode_cursor(page[-1].pk)
+        if page and has_previous:
+            self.previous = self.encode_cursor(page[0].pk, reverse=True)
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next,
+            'previous': self.previous,
+            'results': data,
+        })
 
 
 class LimitPageNumberPaginator(PageNumberPagination):
-    """Настройки пагинатора."""
+    """Настройки пагинатора.
+
+    С параметром ?cursor= (в том числе пустым) страницы отдаются по
+    курсору, иначе сохраняется прежний формат с номерами страниц.
+    Выборки с другим порядком, например результаты поиска, всегда
+    выводятся по номерам страниц.
+    """
 
     page_size = 6
     page_size_query_param = 'limit'
+    cursor_query_param = IdCursorPaginator.cursor_query_param
+
+    def use_cursor(self, queryset, request):
+        return (
+            self.cursor_query_param in request.query_params
+            and isinstance(queryset, QuerySet)
+            and IdCursorPaginator.supports(queryset)
+        )
+
+    def window(self, queryset, request):
+        """Записи, от которых зависит ответ: для курсора только страница."""
+        if self.use_cursor(queryset, request):
+            return IdCursorPaginator().window(queryset, request)
+        return queryset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor = None
+        if self.use_cursor(queryset, request):
+            self.cursor = IdCursorPaginator()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset для асинхронных представлений."""
+        self.cursor = None
+        if self.use_cursor(queryset, request):
+            self.cursor = IdCursorPaginator()
+            return await self.cursor.apaginate_queryset(queryset, request)
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        self.page.object_list = [
+            obj async for obj in self.page.object_list.aiterator(
+                chunk_size=page_size
+            )
+        ]
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
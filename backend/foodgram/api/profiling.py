@@ -0,0 +1,162 @@
+"""Профилирование SQL-запросов по запросам к API."""
+import re
+import sys
+from collections import Counter, deque
+from functools import lru_cache
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils import timezone
+from rest_framework.fields import Field
+from rest_framework.serializers import BaseSerializer
+
+from . import metrics
+
+PLACEHOLDER_LIST = re.compile(r'\((?:%s, )+%s\)')
+NUMBER = re.compile(r'\b\d+\b')
+FRAMEWORK_PATHS = ('/django/', '/rest_framework/', '/djoser/')
+# Обертки execute_wrapper: QueryProfile и DbTimer из MetricsMiddleware.
+WRAPPER_FILES = (__file__, metrics.__file__)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """SQL без значений: списки IN разной длины считаются одним запросом."""
+    return NUMBER.sub('?', PLACEHOLDER_LIST.sub('(...)', sql))
+
+
+def find_origin():
+    """Метод сериализатора или строка кода проекта, выполнившая запрос."""
+    frame = sys._getframe(1)
+    project_frame = None
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename not in WRAPPER_FILES and not any(
+            part in code.co_filename for part in FRAMEWORK_PATHS
+        ):
+            owner = frame.f_locals.get('self')
+            if isinstance(owner, (BaseSerializer, Field)):
+                return f'{type(owner).__name__}.{code.co_name}'
+            if project_frame is None and code.co_filename.startswith(
+                str(settings.BASE_DIR)
+            ):
+                project_frame = (
+                    f'{code.co_filename}:{frame.f_lineno} {code.co_name}'
+                )
+        frame = frame.f_back
+    return project_frame
+
+
+class QueryProfile:
+    """Счетчики запросов одного HTTP-запроса."""
+
+    def __init__(self, repeat_limit):
+        self.repeat_limit = repeat_limit
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+            self.count += 1
+            key = fingerprint(sql)
+            self.fingerprints[key] += 1
+            # Стек разбирается один раз, когда запрос становится N+1.
+            if self.fingerprints[key] == self.repeat_limit + 1:
+                self.origins[key] = find_origin()
+
+    def repeated(self):
+        return [
+            {
+                'sql': sql,
+                'count': self.fingerprints[sql],
+                'origin': origin,
+            }
+            for sql, origin in self.origins.items()
+        ]
+
+
+class OffenderLog:
+    """Последние запросы с N+1 или превышением числа запросов."""
+
+    def __init__(self, size):
+        self._lock = Lock()
+        self._records = deque(maxlen=size)
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def worst(self):
+        with self._lock:
+            records = list(self._records)
+        return sorted(
+            records, key=lambda record: record['db_ms'], reverse=True
+        )
+
+
+offenders = OffenderLog(settings.SQL_PROFILING_BUFFER)
+
+
+class QueryProfileMiddleware:
+    """Число запросов, время БД и N+1 в заголовке Server-Timing.
+
+    Включается настройкой SQL_PROFILING, иначе Django исключает
+    middleware из цепочки.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SQL_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = QueryProfile(settings.SQL_PROFILING_REPEAT_LIMIT)
+        started = perf_counter()
+        with connection.execute_wrapper(profile):
+            response = self.get_response(request)
+        return self.report(request, response, started, profile)
+
+    async def __acall__(self, request):
+        profile = QueryProfile(settings.SQL_PROFILING_REPEAT_LIMIT)
+        started = perf_counter()
+        with connection.execute_wrapper(profile):
+            response = await self.get_response(request)
+        return self.report(request, response, started, profile)
+
+    def report(self, request, response, started, profile):
+        total = (perf_counter() - started) * 1000
+        db = profile.duration * 1000
+        response['Server-Timing'] = (
+            f'db;dur={db:.1f};desc="{profile.count} queries", '
+            f'total;dur={total:.1f}'
+        )
+        repeated = profile.repeated()
+        if repeated or profile.count > settings.SQL_PROFILING_MAX_QUERIES:
+            offenders.add({
+                'time': timezone.now().isoformat(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'queries': profile.count,
+                'db_ms': round(db, 1),
+                'total_ms': round(total, 1),
+                'repeated': repeated,
+            })
+        return response
@@ -0,0 +1,30 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+# Без OPT_PASSTHROUGH_SUBCLASS: ReturnDict и ReturnList
+# сериализуются orjson как обычные dict и list.
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с тем же выводом.
+
+    Даты, Decimal и ленивые строки передаются кодировщику DRF.
+    Отступы и ensure_ascii обрабатывает стандартный JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None or not self.compact or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default, option=OPTIONS
+        )
+        # Как в JSONRenderer: U+2028 и U+2029 недопустимы в JavaScript.
+        return ret.replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(b'\xe2\x80\xa9', b'\\u2029')
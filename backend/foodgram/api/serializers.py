@@ -4,12 +4,14 @@ from django.core.validators import (
     MinValueValidator,
     RegexValidator
 )
-from django.db import transaction
+from django.db import models, transaction
+from django.urls import reverse
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
-from .fields import Base64ImageField
+from . import fast_serializers, fragments
+from .fields import Base64ImageField, RenditionField
 from recipes.models import (
     Ingredient, Recipe, RecipeIngredient, ShortLink, Tag
 )
@@ -36,13 +38,16 @@ class CustomUserSerializer(UserSerializer):
     """Просмотр информации о пользователе."""
 
     is_subscribed = serializers.SerializerMethodField()
+    avatar_small = RenditionField('avatar', source='avatar')
 
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name',
-                  'last_name', 'is_subscribed', 'avatar')
+                  'last_name', 'is_subscribed', 'avatar', 'avatar_small')
 
     def get_is_subscribed(self, object):
+        if hasattr(object, 'is_subscribed'):
+            return object.is_subscribed
         request = self.context['request']
         if request.user.is_anonymous:
             return False
@@ -114,35 +119,46 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
     """Вывод короткой информации о рецепте."""
 
     image = Base64ImageField(required=True)
+    image_card = RenditionField('card', source='image')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_card', 'cooking_time')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового добавления и удаления."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=100
+    )
 
 
 class SubscriptionSerializer(CustomUserSerializer):
     """Получение подписок пользователя."""
 
     recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed', 'recipes', 'recipes_count', 'avatar')
+                  'is_subscribed', 'recipes', 'recipes_count', 'avatar',
+                  'avatar_small')
 
     def get_recipes(self, object):
-        request = self.context['request']
-        limit = request.GET.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=object)
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(object, 'short_recipes'):
+            recipes = object.short_recipes
+        else:
+            request = self.context['request']
+            limit = request.GET.get('recipes_limit')
+            recipes = Recipe.objects.filter(author=object)
+            if limit and limit.isdigit():
+                recipes = recipes[:int(limit)]
         serializer = ShortRecipeSerializer(recipes, many=True)
         return serializer.data
 
-    def get_recipes_count(self, object):
-        return object.recipes.count()
-
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Получение ингредиентов в рецепте."""
@@ -158,8 +174,21 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """Список рецептов через кэш фрагментов."""
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        return fragments.render(self.child, list(data))
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
-    """Получение рецепта."""
+    """Получение рецепта.
+
+    Общая часть представления берется из api.fragments, личные поля
+    подставляются для каждого пользователя.
+    """
 
     author = CustomUserSerializer(default=serializers.CurrentUserDefault())
     tags = TagSerializer(many=True)
@@ -169,41 +198,90 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_card = RenditionField('card', source='image')
+    image_detail = RenditionField('detail', source='image')
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'image_card',
+            'image_detail', 'text', 'cooking_time'
         )
         read_only_fields = ('author', 'tags', 'ingredients')
+        list_serializer_class = RecipeListSerializer
+
+    personal_fields = ('is_favorited', 'is_in_shopping_cart')
+
+    def to_representation(self, instance):
+        return fragments.render(self, [instance])[0]
+
+    def field_representation(self, instance):
+        """Представление полями DRF, эталон для fast_serializers.
+
+        Нужны with_user_flags и prefetch_related тегов и состава.
+        """
+        instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
+    def shared_representations(self, recipes):
+        """Общие части представлений для кэша фрагментов."""
+        return fast_serializers.recipes_data(
+            recipes, self.context.get('request')
+        )
+
+    def overlay(self, fragment, instance):
+        """Фрагмент с личными полями текущего пользователя."""
+        data = dict(fragment)
+        for name in self.personal_fields:
+            field = self.fields[name]
+            data[name] = field.to_representation(
+                field.get_attribute(instance)
+            )
+        data['author'] = {
+            **fragment['author'],
+            'is_subscribed': instance.author_is_subscribed,
+        }
+        return data
 
     def get_is_favorited(self, object):
-        request = self.context['request']
-        if request.user.is_anonymous:
-            return False
-        return object.favorite.filter(user=request.user).exists()
+        return object.is_favorited
 
     def get_is_in_shopping_cart(self, object):
-        request = self.context['request']
-        if request.user.is_anonymous:
-            return False
-        return object.shopping_cart.filter(user=request.user).exists()
+        return object.is_in_shopping_cart
 
 
-class IngredientCreateSerializer(serializers.ModelSerializer):
-    """Проверка ингредиента при создании рецепта."""
+class RecipeCoverageSerializer(RecipeGetSerializer):
+    """Рецепт с числом имеющихся и недостающих ингредиентов."""
+
+    ingredients_have = serializers.ReadOnlyField()
+    ingredients_missing = serializers.ReadOnlyField()
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
+    class Meta(RecipeGetSerializer.Meta):
+        fields = RecipeGetSerializer.Meta.fields + (
+            'ingredients_have', 'ingredients_missing'
+        )
+
+    personal_fields = RecipeGetSerializer.personal_fields + (
+        'ingredients_have', 'ingredients_missing'
     )
+
+
+class IngredientCreateSerializer(serializers.ModelSerializer):
+    """Проверка ингредиента при создании рецепта.
+
+    Существование ингредиентов проверяется одним запросом
+    в RecipeCreateSerializer.validate_ingredients.
+    """
+
+    id = serializers.IntegerField(min_value=1)
     amount = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
 
-    def validate_amout(self, value):
+    def validate_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError(
                 'Количество должно быть больше 0'
@@ -211,11 +289,22 @@ class IngredientCreateSerializer(serializers.ModelSerializer):
         return value
 
 
+def check_ids_exist(model, ids, message):
+    """Проверка списка id одним запросом IN."""
+    missing = set(ids) - set(
+        model.objects.filter(pk__in=ids).values_list('pk', flat=True)
+    )
+    if missing:
+        raise serializers.ValidationError(
+            f'{message}: {", ".join(map(str, sorted(missing)))}'
+        )
+
+
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Создание и обновление рецептов."""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), write_only=True
     )
     ingredients = IngredientCreateSerializer(
         write_only=True, many=True
@@ -233,48 +322,95 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             'ingredients', 'tags', 'image', 'name', 'text', 'cooking_time'
         )
 
-    def validate(self, data):
-        ingredienеts_list = [
-            ingredient.get('id') for ingredient in data.get('ingredients')
-        ]
-        if len(ingredienеts_list) == len(set(ingredienеts_list)):
-            return data
-        raise serializers.ValidationError(
-            'В рецепте два одинаковых ингредиента'
+    def validate_tags(self, value):
+        tags = list(dict.fromkeys(value))
+        check_ids_exist(Tag, tags, 'Несуществующие теги')
+        return tags
+
+    def validate_ingredients(self, value):
+        ingredients = [ingredient['id'] for ingredient in value]
+        if len(ingredients) != len(set(ingredients)):
+            raise serializers.ValidationError(
+                'В рецепте два одинаковых ингредиента'
+            )
+        check_ids_exist(
+            Ingredient, ingredients, 'Несуществующие ингредиенты'
         )
+        return value
 
     def create_ingredients(self, ingredients, recipe):
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredients_list.append(
-                RecipeIngredient(
-                    recipe=recipe, amount=ingredient['amount'],
-                    ingredient=ingredient['id']
-                )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient['id'],
+                amount=ingredient['amount']
             )
-        RecipeIngredient.objects.bulk_create(ingredients_list)
+            for ingredient in ingredients
+        )
+
+    def update_ingredients(self, ingredients, recipe):
+        """Изменение только отличающихся строк состава рецепта.
+
+        Пакетные операции не отправляют сигналы RecipeIngredient:
+        updated_at и индекс покрытия обновляются при сохранении рецепта.
+        """
+        current = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(
+                recipe=recipe
+            ).only('id', 'ingredient_id', 'amount')
+        }
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = [
+            row.pk for ingredient_id, row in current.items()
+            if ingredient_id not in amounts
+        ]
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            row = current.get(ingredient_id)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        self.create_ingredients(
+            [
+                ingredient for ingredient in ingredients
+                if ingredient['id'] not in current
+            ],
+            recipe
+        )
 
     @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
+        recipe.tags.add(*tags)
         self.create_ingredients(ingredients, recipe)
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        instance.ingredients.clear()
-        self.create_ingredients(ingredients, instance)
-        instance.tags.clear()
-        instance.tags.set(tags)
+        ingredients = validated_data.pop('ingredients', None)
+        if ingredients is not None:
+            self.update_ingredients(ingredients, instance)
+        tags = validated_data.pop('tags', None)
+        if tags is not None:
+            # set() сравнивает с текущими тегами и меняет только разницу.
+            instance.tags.set(tags)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         request = self.context['request']
+        # Ответ строится по свежей выборке с автором и флагами.
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
         serializer = RecipeGetSerializer(
             instance, context={'request': request}
         )
@@ -284,11 +420,12 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 class ShortLinkSerializer(serializers.ModelSerializer):
     """Создание короткой ссылки."""
 
-    short_link = serializers.CharField(source='surl')
-
     class Meta:
         model = ShortLink
-        fields = ('short_link',)
+        fields = ('code',)
 
     def to_representation(self, value):
-        return {'short-link': value.surl}
+        request = self.context['request']
+        return {'short-link': request.build_absolute_uri(
+            reverse('short-link', args=(value.code,))
+        )}
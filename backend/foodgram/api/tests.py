@@ -0,0 +1,470 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import fragments, views
+from api.mixins import CachedListMixin
+from api.serializers import TagSerializer
+from api.metrics import DbTimer
+from api.profiling import QueryProfile
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag
+)
+from users.models import Subscriber, User
+
+
+class RecipeDataTestCase(TestCase):
+    """Рецепты разных авторов с тегами, составом и флагами читателя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader', password='pass',
+            first_name='Читатель', last_name='Тестовый'
+        )
+        authors = [
+            User.objects.create_user(
+                email=f'author{i}@example.com', username=f'author{i}',
+                password='pass', first_name='Автор', last_name=str(i)
+            )
+            for i in range(3)
+        ]
+        tags = [
+            Tag.objects.create(name=f'Тег {i}', slug=f'tag{i}')
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {i}', measurement_unit='г'
+            )
+            for i in range(5)
+        ]
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}', text='Описание', cooking_time=10,
+                author=authors[i % len(authors)],
+                image=f'recipes/{i}.png' if i % 2 else None
+            )
+            recipe.tags.set(tags[:1 + i % len(tags)])
+            for j in range(3):
+                RecipeIngredient.objects.create(
+                    recipe=recipe,
+                    ingredient=ingredients[(i + j) % len(ingredients)],
+                    amount=j + 1
+                )
+            if i % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if i % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscriber.objects.create(user=cls.user, author=authors[0])
+        User.objects.filter(pk=authors[0].pk).update(avatar='users/0.png')
+
+
+class RecipeQueriesTest(RecipeDataTestCase):
+    """Число запросов чтения рецептов не зависит от размера страницы."""
+
+    def setUp(self):
+        fragments.cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_list_queries(self, client, cold, warm):
+        for limit in (2, 6, 8):
+            fragments.cache.clear()
+            for queries in (cold, warm):
+                with self.subTest(limit=limit, queries=queries):
+                    with self.assertNumQueries(queries):
+                        response = client.get(
+                            '/api/recipes/', {'limit': limit}
+                        )
+                    self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_queries(self):
+        # Без фрагментов в кэше теги и состав читаются тремя запросами.
+        self.assert_list_queries(self.client, cold=7, warm=4)
+
+    def test_anonymous_list_queries(self):
+        self.assert_list_queries(APIClient(), cold=6, warm=3)
+
+    def test_list_flags(self):
+        response = self.client.get('/api/recipes/', {'limit': 10})
+        results = {item['id']: item for item in response.data['results']}
+        for recipe in Recipe.objects.all():
+            item = results[recipe.pk]
+            self.assertEqual(
+                item['is_favorited'],
+                Favorite.objects.filter(
+                    user=self.user, recipe=recipe
+                ).exists()
+            )
+            self.assertEqual(
+                item['is_in_shopping_cart'],
+                ShoppingCart.objects.filter(
+                    user=self.user, recipe=recipe
+                ).exists()
+            )
+            self.assertEqual(
+                item['author']['is_subscribed'],
+                Subscriber.objects.filter(
+                    user=self.user, author=recipe.author
+                ).exists()
+            )
+            self.assertEqual(len(item['ingredients']), 3)
+
+    def test_retrieve_queries(self):
+        recipe = Recipe.objects.first()
+        path = f'/api/recipes/{recipe.pk}/'
+        self.client.get(path)
+        with self.assertNumQueries(2):
+            response = self.client.get(path)
+        self.assertEqual(response.data['id'], recipe.pk)
+
+
+class FastSerializersTest(RecipeDataTestCase):
+    """Быстрые представления совпадают с сериализаторами DRF."""
+
+    def test_output_matches_drf(self):
+        # benchmark_serializers сравнивает вывод побайтно и при
+        # расхождении завершается с CommandError.
+        call_command(
+            'benchmark_serializers', items=20, repeat=1, stdout=StringIO()
+        )
+
+
+class CursorPaginationTest(RecipeDataTestCase):
+    """Страницы рецептов по курсору и откат к номерам страниц."""
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, page):
+        return [recipe['id'] for recipe in page['results']]
+
+    def test_round_trip(self):
+        expected = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)
+        )
+        page = self.get('/api/recipes/', cursor='', limit=4)
+        self.assertNotIn('count', page)
+        self.assertIsNone(page['previous'])
+        pages = [self.ids(page)]
+        while page['next']:
+            page = self.get(page['next'])
+            pages.append(self.ids(page))
+        self.assertEqual([len(ids) for ids in pages], [4, 4, 2])
+        self.assertEqual(sum(pages, []), expected)
+        back = [self.ids(page)]
+        while page['previous']:
+            page = self.get(page['previous'])
+            back.append(self.ids(page))
+        self.assertEqual(back, pages[::-1])
+        self.assertIsNotNone(page['next'])
+
+    def test_reverse_page_keeps_order(self):
+        first = self.get('/api/recipes/', cursor='', limit=3)
+        second = self.get(first['next'])
+        previous = self.get(second['previous'])
+        self.assertEqual(self.ids(previous), self.ids(first))
+        self.assertIsNone(previous['previous'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('не-base64', 'cD1hYmM=', 'eD0x'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/recipes/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_search_uses_page_numbers(self):
+        page = self.get('/api/recipes/', cursor='', search='Рецепт')
+        self.assertEqual(page['count'], Recipe.objects.count())
+        self.assertEqual(len(page['results']), 6)
+
+
+class TokenAuthenticationTest(TestCase):
+    """Токен проверяется в каждом запросе, выход его отзывает."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader', password='pass',
+            first_name='Читатель', last_name='Тестовый'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/token/login/',
+            {'email': 'reader@example.com', 'password': 'pass'}
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {response.data["auth_token"]}'
+        )
+
+    def test_me_queries(self):
+        # Токен с пользователем читаются одним запросом с JOIN, второй
+        # запрос - is_subscribed. Повторный запрос не дешевле первого.
+        for _ in range(2):
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/users/me/')
+            self.assertEqual(response.data['id'], self.user.pk)
+
+    def test_logout_revokes_token(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+        self.assertEqual(
+            self.client.get('/api/recipes/').status_code, 401
+        )
+
+
+class QueryProfileTest(RecipeDataTestCase):
+    """Источник N+1 указывает на код проекта, а не на обертки запросов."""
+
+    def test_origin_of_repeated_query(self):
+        profile = QueryProfile(repeat_limit=2)
+        # Как в цепочке middleware: DbTimer из MetricsMiddleware снаружи.
+        with connection.execute_wrapper(DbTimer()), \
+                connection.execute_wrapper(profile):
+            for recipe in Recipe.objects.all():
+                recipe.author.username
+        [repeated] = profile.repeated()
+        self.assertEqual(repeated['count'], Recipe.objects.count())
+        self.assertIn('users_user', repeated['sql'])
+        self.assertTrue(repeated['origin'].startswith(f'{__file__}:'))
+        self.assertTrue(
+            repeated['origin'].endswith(' test_origin_of_repeated_query')
+        )
+
+
+class BulkFavoritesTest(RecipeDataTestCase):
+    """Массовое избранное: статусы по id и точные счетчики."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipes = list(Recipe.objects.order_by('name'))
+
+    def assert_counters_exact(self):
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                recipe.favorites_count,
+                Favorite.objects.filter(recipe=recipe).count()
+            )
+
+    def post(self, ids, method='post'):
+        response = getattr(self.client, method)(
+            '/api/recipes/favorite/', {'recipes': ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [item['status'] for item in response.data]
+
+    def test_mixed_ids(self):
+        new, existing = self.recipes[0], self.recipes[1]
+        unknown = Recipe.objects.order_by('-pk').first().pk + 1
+        self.assertEqual(
+            self.post([new.pk, existing.pk, unknown, new.pk]),
+            ['added', 'already_added', 'not_found']
+        )
+        self.assertEqual(
+            self.post([new.pk, existing.pk, unknown, self.recipes[2].pk],
+                      'delete'),
+            ['removed', 'removed', 'not_found', 'not_added']
+        )
+        self.assert_counters_exact()
+
+    def test_concurrent_insert_not_counted(self):
+        new, other = self.recipes[0], self.recipes[2]
+        insert_new = views.insert_new
+
+        def racing_insert(model, fields, rows, returning):
+            # Другой запрос добавил рецепт после чтения present.
+            Favorite.objects.create(user=self.user, recipe=new)
+            return insert_new(model, fields, rows, returning)
+
+        with mock.patch.object(views, 'insert_new', racing_insert):
+            self.assertEqual(
+                self.post([new.pk, other.pk]), ['already_added', 'added']
+            )
+        self.assert_counters_exact()
+
+
+class ConditionalRequestsTest(RecipeDataTestCase):
+    """ETag рецептов и изменения автора, которые его меняют."""
+
+    def setUp(self):
+        fragments.cache.clear()
+        self.recipe = Recipe.objects.select_related('author').first()
+        self.path = f'/api/recipes/{self.recipe.pk}/'
+
+    def etag(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified(self):
+        for path in (self.path, '/api/recipes/'):
+            with self.subTest(path=path):
+                etag = self.etag(path)
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_author_changes(self):
+        author = User.objects.get(pk=self.recipe.author_id)
+        changes = (
+            ('first_name', 'Другое', True),
+            ('email', 'new@example.com', True),
+            ('avatar', 'users/new.png', True),
+            ('last_login', timezone.now(), False),
+            ('password', 'hash', False),
+            ('is_staff', True, False),
+        )
+        for field, value, invalidates in changes:
+            with self.subTest(field=field):
+                etags = {self.etag(self.path), self.etag('/api/recipes/')}
+                setattr(author, field, value)
+                author.save()
+                self.assertEqual(
+                    etags.isdisjoint(
+                        {self.etag(self.path), self.etag('/api/recipes/')}
+                    ),
+                    invalidates
+                )
+
+    def test_unchanged_save_keeps_etag(self):
+        etag = self.etag(self.path)
+        User.objects.get(pk=self.recipe.author_id).save()
+        self.assertEqual(self.etag(self.path), etag)
+
+
+class RecipeUpdateTest(RecipeDataTestCase):
+    """Обновление рецепта меняет только отличающиеся строки состава."""
+
+    def setUp(self):
+        # У первого рецепта один тег из трех и три ингредиента.
+        self.recipe = Recipe.objects.order_by('id').first()
+        self.client = APIClient()
+        self.client.force_authenticate(self.recipe.author)
+        self.rows = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=self.recipe)
+        }
+        self.tags = set(self.recipe.tags.values_list('pk', flat=True))
+
+    def patch(self, ingredients, tags):
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {'ingredients': ingredients, 'tags': tags}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_ingredient_diff(self):
+        kept, changed, removed = sorted(
+            self.rows.values(), key=lambda row: row.amount
+        )
+        added = Ingredient.objects.exclude(pk__in=self.rows).first()
+        self.patch([
+            {'id': kept.ingredient_id, 'amount': kept.amount},
+            {'id': changed.ingredient_id, 'amount': 500},
+            {'id': added.pk, 'amount': 7},
+        ], list(self.tags))
+        rows = {
+            row.ingredient_id: (row.pk, row.amount)
+            for row in RecipeIngredient.objects.filter(recipe=self.recipe)
+        }
+        self.assertEqual(rows.pop(kept.ingredient_id), (kept.pk, kept.amount))
+        self.assertEqual(rows.pop(changed.ingredient_id), (changed.pk, 500))
+        self.assertEqual(rows.pop(added.pk)[1], 7)
+        self.assertEqual(rows, {})
+
+    def test_tag_diff(self):
+        through = Recipe.tags.through.objects.filter(recipe=self.recipe)
+        kept = dict(through.values_list('tag_id', 'pk'))
+        added = Tag.objects.exclude(pk__in=self.tags).first()
+        tags = list(kept)[:1] + [added.pk]
+        self.patch([
+            {'id': row.ingredient_id, 'amount': row.amount}
+            for row in self.rows.values()
+        ], tags)
+        current = dict(through.values_list('tag_id', 'pk'))
+        self.assertEqual(set(current), set(tags))
+        self.assertEqual(current[tags[0]], kept[tags[0]])
+
+    def test_unchanged_update_writes_nothing(self):
+        ingredients = [
+            {'id': row.ingredient_id, 'amount': row.amount}
+            for row in self.rows.values()
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            self.patch(ingredients, list(self.tags))
+        tables = (
+            RecipeIngredient._meta.db_table,
+            Recipe.tags.through._meta.db_table,
+        )
+        writes = [
+            query['sql'] for query in queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            and any(table in query['sql'] for table in tables)
+        ]
+        self.assertEqual(writes, [])
+
+
+class CachedListTest(TestCase):
+    """Списки тегов: ETag из версии и 304 без сериализации."""
+
+    path = '/api/tags/'
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+
+    def setUp(self):
+        CachedListMixin._cache.clear()
+
+    def test_not_modified_without_serializing(self):
+        etag = self.client.get(self.path)['ETag']
+        CachedListMixin._cache.clear()
+        with mock.patch.object(
+            TagSerializer, 'to_representation'
+        ) as to_representation, self.assertNumQueries(1):
+            response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+
+    def test_cached_data_is_plain_list(self):
+        response = self.client.get(self.path)
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.path)
+        self.assertEqual(cached.json(), response.json())
+        _, data = CachedListMixin._cache['tags']
+        self.assertIs(type(data), list)
+
+    def test_change_invalidates(self):
+        etag = self.client.get(self.path)['ETag']
+        Tag.objects.create(name='Ужин', slug='dinner')
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    @override_settings(ROOT_URLCONF='foodgram.asgi_urls')
+    async def test_async_not_modified_on_cache_miss(self):
+        client = AsyncClient()
+        response = await client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        CachedListMixin._cache.clear()
+        response = await client.get(
+            self.path, headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('tags', CachedListMixin._cache)
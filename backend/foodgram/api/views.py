@@ -1,33 +1,44 @@
-import random
-from string import ascii_letters
-
-from django.contrib.sites.shortcuts import get_current_site
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Prefetch, Sum, Value
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import status
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import (
+    AllowAny, IsAdminUser, IsAuthenticated
+)
 from rest_framework.response import Response
 
+from . import fast_serializers, shopping_list
+from .conditional import (
+    not_modified, recipe_list_etag, recipe_validators, set_validators
+)
 from .filters import IngredientFilter, RecipeFilter
+from .mixins import CachedListMixin
 from .paginators import LimitPageNumberPaginator
 from .permissions import IsAuthorOrAdminOrReadOnly
+from .profiling import offenders
 from .serializers import (
     AvatarUserSerializer,
     CustomUserSerializer,
     IngredientSerializer,
+    RecipeCoverageSerializer,
     RecipeCreateSerializer,
     RecipeGetSerializer,
+    RecipeIdsSerializer,
     ShortLinkSerializer,
     ShortRecipeSerializer,
     SubscriptionSerializer,
     TagSerializer,
     UserSerializer
 )
+from recipes import short_links
+from recipes.counters import change_counter, insert_new
+from recipes.coverage_index import coverage_index
+from recipes.ingredient_index import ingredient_index
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -37,26 +48,41 @@ from recipes.models import (
     ShoppingCart,
     Tag
 )
+from recipes.signals import RECIPE_COUNTERS
 from users.models import Subscriber, User
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(CachedListMixin, ReadOnlyModelViewSet):
     """Получение тэгов."""
 
+    cache_version_name = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CachedListMixin, ReadOnlyModelViewSet):
     """Получение ингредиентов."""
 
+    cache_version_name = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Автодополнение по названию обслуживается индексом в памяти."""
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = request.query_params.get('limit')
+        ingredients = ingredient_index.search(
+            name, limit=int(limit) if limit and limit.isdigit() else None
+        )
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
+
 
 class RecipeViewSet(ModelViewSet):
     """Создание и получение рецептов."""
@@ -66,16 +92,58 @@ class RecipeViewSet(ModelViewSet):
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
 
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.with_related().with_user_flags(
+                self.request.user
+            )
+        return Recipe.objects.all()
+
+    def perform_content_negotiation(self, request, force=False):
+        # В download_shopping_cart параметр ?format= выбирает формат файла,
+        # а не рендерер DRF.
+        return super().perform_content_negotiation(
+            request, force=force or self.action == 'download_shopping_cart'
+        )
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeGetSerializer
         if self.action in ('favorite', 'shopping_cart'):
             return ShortRecipeSerializer
+        if self.action == 'coverage':
+            return RecipeCoverageSerializer
         return RecipeCreateSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def conditional_response(self, request, etag, last_modified, get):
+        """Отдает 304 по валидаторам или полный ответ с ними."""
+        response = not_modified(request, etag, last_modified) or get()
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = recipe_list_etag(
+            self.paginator.window(queryset, request), request
+        )
+        return self.conditional_response(
+            request, etag, None,
+            lambda: super(RecipeViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = recipe_validators(
+            self.get_queryset(), request, kwargs['pk']
+        )
+        return self.conditional_response(
+            request, etag, last_modified,
+            lambda: super(RecipeViewSet, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+
     def remove_from_favorite_or_cart(self, request, model, instance):
         """Метод удаления рецепта из избранного/корзины."""
         obj = model.objects.filter(
@@ -98,6 +166,70 @@ class RecipeViewSet(ModelViewSet):
         serializer = self.get_serializer(instance)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
+    def bulk_favorite_or_cart(self, request, model):
+        """Массовое добавление/удаление рецептов в избранное/корзину.
+
+        Возвращает статус по каждому id: added, already_added, removed,
+        not_added или not_found.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        found = set(
+            Recipe.objects.filter(pk__in=ids).values_list('pk', flat=True)
+        )
+        rows = model.objects.filter(user=request.user, recipe_id__in=found)
+        if request.method == 'DELETE':
+            # Параллельное удаление тех же строк дождется коммита, не
+            # найдет их и не уменьшит счетчики второй раз.
+            rows = rows.select_for_update()
+        present = set(rows.values_list('recipe_id', flat=True))
+        if request.method == 'POST':
+            # Параллельный запрос мог добавить часть рецептов после
+            # чтения present: счетчики увеличиваются только для строк,
+            # которые действительно вставлены. Сигналы при этом не
+            # отправляются, счетчики меняются одним UPDATE.
+            changed = set(insert_new(
+                model, ('user', 'recipe'),
+                [(request.user.pk, pk) for pk in found - present], 'recipe'
+            ))
+            if changed:
+                change_counter(
+                    Recipe.objects.filter(pk__in=changed),
+                    RECIPE_COUNTERS[model], 1
+                )
+            done, skipped = 'added', 'already_added'
+        else:
+            changed = present
+            # Счетчики уменьшают сигналы post_delete.
+            rows.delete()
+            done, skipped = 'removed', 'not_added'
+        return Response([
+            {
+                'id': pk,
+                'status': (
+                    'not_found' if pk not in found
+                    else done if pk in changed else skipped
+                ),
+            }
+            for pk in ids
+        ])
+
+    @action(detail=False, methods=['post', 'delete'],
+            permission_classes=[IsAuthenticated], url_path='favorite',
+            url_name='favorite-bulk')
+    def favorite_bulk(self, request):
+        """Массовое добавление/удаление рецептов в избранное."""
+        return self.bulk_favorite_or_cart(request, Favorite)
+
+    @action(detail=False, methods=['post', 'delete'],
+            permission_classes=[IsAuthenticated], url_path='shopping_cart',
+            url_name='shopping-cart-bulk')
+    def shopping_cart_bulk(self, request):
+        """Массовое добавление/удаление рецептов в корзину."""
+        return self.bulk_favorite_or_cart(request, ShoppingCart)
+
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[IsAuthenticated], url_path='favorite')
     def favorite(self, request, pk):
@@ -116,12 +248,55 @@ class RecipeViewSet(ModelViewSet):
             return self.add_to_favorite_or_cart(request, ShoppingCart, recipe)
         return self.remove_from_favorite_or_cart(request, ShoppingCart, recipe)
 
+    @action(detail=False)
+    def coverage(self, request):
+        """Рецепты, для которых уже есть больше всего ингредиентов."""
+        try:
+            ingredient_ids = [
+                int(value) for value in request.query_params.getlist(
+                    'ingredients'
+                )
+            ]
+            max_missing = request.query_params.get('max_missing')
+            if max_missing is not None:
+                max_missing = int(max_missing)
+        except ValueError:
+            return Response(
+                'id ингредиентов и max_missing должны быть числами',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ingredient_ids:
+            return Response(
+                'Укажите ингредиенты', status=status.HTTP_400_BAD_REQUEST
+            )
+        page = self.paginate_queryset(
+            coverage_index.rank(ingredient_ids, max_missing)
+        )
+        recipes = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).in_bulk([recipe_id for recipe_id, _, _ in page])
+        results = []
+        for recipe_id, have, missing in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.ingredients_have = have
+                recipe.ingredients_missing = missing
+                results.append(recipe)
+        serializer = self.get_serializer(results, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=False, permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
-        """Скачивание списка покупок."""
+        """Скачивание списка покупок в формате txt, csv или json."""
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in shopping_list.FORMATS:
+            return Response(
+                'Неизвестный формат списка покупок',
+                status=status.HTTP_400_BAD_REQUEST
+            )
         shopping_cart = ShoppingCart.objects.filter(
             user=self.request.user).values('recipe_id')
-        if not shopping_cart:
+        if not shopping_cart.exists():
             return Response(
                 'Список покупок пуст', status=status.HTTP_400_BAD_REQUEST
             )
@@ -129,16 +304,13 @@ class RecipeViewSet(ModelViewSet):
             recipe__in=shopping_cart
         ).values('ingredient__name', 'ingredient__measurement_unit').annotate(
             quantity=Sum('amount')
+        ).order_by('ingredient__name')
+        content_type, render = shopping_list.FORMATS[file_format]
+        response = StreamingHttpResponse(
+            render(ingredients.iterator()), content_type=content_type
         )
-        groceries_list = ''
-        for item in ingredients:
-            groceries_list += (
-                f'{item.get("ingredient__name")} - {item.get("quantity")}'
-                f'{item.get("ingredient__measurement_unit")}.\n')
-        file = 'Необходимо купить:\n' + groceries_list
-        response = HttpResponse(file, content_type="text/plain")
         response['Content-Disposition'] = (
-            'attachment; filename=file.txt'
+            f'attachment; filename=shopping_list.{file_format}'
         )
         return response
 
@@ -146,28 +318,28 @@ class RecipeViewSet(ModelViewSet):
 @api_view(['GET'])
 def short_link(request, recipe_id):
     """Получение короткой ссылки."""
-    recipe = get_object_or_404(Recipe, id=recipe_id)
-    if ShortLink.objects.filter(lurl=recipe.get_absolute_url()).exists():
-        serializer = ShortLinkSerializer(
-            ShortLink.objects.get(lurl=recipe.get_absolute_url())
-        )
-        return Response(serializer.data)
-    domain = request.scheme + "://" + request.META.get('HTTP_HOST') + '/s/'
-    surl = domain + (''.join(random.sample(ascii_letters, k=7)))
-    link, _ = ShortLink.objects.get_or_create(
-        lurl=recipe.get_absolute_url(),
-        surl=surl
-    )
-    serializer = ShortLinkSerializer(link)
+    if not Recipe.objects.filter(id=recipe_id).exists():
+        raise Http404
+    link = ShortLink(recipe_id=recipe_id, code=short_links.encode(recipe_id))
+    ShortLink.objects.bulk_create([link], ignore_conflicts=True)
+    serializer = ShortLinkSerializer(link, context={'request': request})
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def query_profiles(request):
+    """Последние запросы с N+1 и превышением числа SQL-запросов."""
+    return Response(offenders.worst())
+
+
 def get_full_link(request, short_link):
     """Получение оригинальной ссылки."""
-    domain = request.scheme + "://" + get_current_site(request).name + '/s/'
-    link = get_object_or_404(ShortLink, surl=domain + short_link)
-    link = link.lurl.replace('/api', '', 1)[:-1]
-    return redirect(link)
+    try:
+        recipe_id = short_links.resolve(short_link)
+    except ShortLink.DoesNotExist:
+        raise Http404
+    return redirect(f'/recipes/{recipe_id}')
 
 
 class UserViewSet(ModelViewSet):
@@ -193,6 +365,14 @@ class UserViewSet(ModelViewSet):
             return SubscriptionSerializer
         return UserSerializer
 
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        return self.get_paginated_response(
+            fast_serializers.users_data(page, request)
+        )
+
     @action(detail=False, url_path='me')
     def user_self_profile(self, request):
         """Просмотр информации о пользователе."""
@@ -238,12 +418,23 @@ class UserViewSet(ModelViewSet):
     def subscriptions(self, request):
         """Просмотр подписок пользователя."""
         user = self.request.user
-        subscriptions = User.objects.filter(following__user=user)
+        recipes = Recipe.objects.all()
+        limit = request.GET.get('recipes_limit')
+        # Как и limit в других эндпоинтах, нечисловое значение
+        # не учитывается.
+        if limit and limit.isdigit():
+            # Срез в Prefetch выполняется одним запросом
+            # с ROW_NUMBER() OVER (PARTITION BY author_id).
+            recipes = recipes[:int(limit)]
+        subscriptions = User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True),
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='short_recipes')
+        )
         list = self.paginate_queryset(subscriptions)
-        serializer = SubscriptionSerializer(
-            list, many=True, context={'request': request}
+        return self.get_paginated_response(
+            fast_serializers.subscriptions_data(list, request)
         )
-        return self.get_paginated_response(serializer.data)
 
     @action(methods=['post'], detail=False)
     def set_password(self, request, *args, **kwargs):
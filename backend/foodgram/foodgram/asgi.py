@@ -3,5 +3,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+# Частые запросы чтения обслуживаются асинхронными представлениями,
+# остальные маршруты те же, что и в WSGI.
+os.environ.setdefault('ROOT_URLCONF', 'foodgram.asgi_urls')
+# В ASGI постоянное соединение привязано к контексту запроса и не
+# переиспользуется; повторное использование дает только пул.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -0,0 +1,13 @@
+"""Маршруты ASGI: частые запросы чтения обслуживаются асинхронно."""
+from django.urls import path
+
+from api import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/recipes/', async_views.recipe_list),
+    path('api/recipes/<int:pk>/', async_views.recipe_detail),
+    path('api/ingredients/', async_views.ingredient_list),
+    path('api/tags/', async_views.tag_list),
+    path('s/<str:short_link>/', async_views.get_full_link),
+] + sync_urlpatterns
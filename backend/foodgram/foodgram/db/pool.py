@@ -0,0 +1,197 @@
+"""Пул соединений с БД внутри процесса.
+
+Django 5.0 не умеет пулить соединения, поэтому DatabaseWrapper берет
+готовое соединение из пула при connect() и возвращает его при close().
+С CONN_MAX_AGE = 0 соединение возвращается в конце каждого запроса
+и достается следующему запросу любого потока этого воркера.
+"""
+import os
+from collections import deque
+from contextlib import closing
+from functools import partial
+from threading import Condition, Lock
+from time import monotonic, perf_counter
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Соединение, простоявшее в пуле дольше, проверяется запросом SELECT 1
+# перед выдачей, если включен CONN_HEALTH_CHECKS.
+HEALTH_CHECK_IDLE = 5
+
+CHECKED_OUT = Gauge(
+    'foodgram_db_pool_checked_out', 'Соединения, выданные из пула',
+    ('alias',), multiprocess_mode='livesum'
+)
+IDLE = Gauge(
+    'foodgram_db_pool_idle', 'Свободные соединения в пуле',
+    ('alias',), multiprocess_mode='livesum'
+)
+WAITING = Gauge(
+    'foodgram_db_pool_waiting', 'Потоки, ожидающие соединение',
+    ('alias',), multiprocess_mode='livesum'
+)
+CONNECT_DURATION = Histogram(
+    'foodgram_db_connect_seconds', 'Время открытия соединения с БД',
+    ('alias',)
+)
+WAIT_DURATION = Histogram(
+    'foodgram_db_pool_wait_seconds', 'Ожидание свободного соединения',
+    ('alias',)
+)
+TIMEOUTS = Counter(
+    'foodgram_db_pool_timeouts', 'Соединение не получено за TIMEOUT',
+    ('alias',)
+)
+
+
+class ConnectionPool:
+    """SIZE постоянных соединений и до OVERFLOW временных сверх них.
+
+    Когда открыто SIZE + OVERFLOW соединений, поток ждет возврата
+    до TIMEOUT секунд.
+    """
+
+    def __init__(self, alias, size, overflow, timeout):
+        self.alias = alias
+        self.size = size
+        self.overflow = overflow
+        self.timeout = timeout
+        self._condition = Condition()
+        self._idle = deque()
+        self.opened = 0
+        self.checked_out = 0
+        self.waiting = 0
+
+    def _publish(self):
+        CHECKED_OUT.labels(self.alias).set(self.checked_out)
+        IDLE.labels(self.alias).set(len(self._idle))
+        WAITING.labels(self.alias).set(self.waiting)
+
+    def checkout(self, connect, error):
+        """Соединение и время его простоя в пуле (None для нового)."""
+        started = monotonic()
+        with self._condition:
+            while not self._idle and (
+                self.opened >= self.size + self.overflow
+            ):
+                remaining = self.timeout - (monotonic() - started)
+                if remaining <= 0:
+                    TIMEOUTS.labels(self.alias).inc()
+                    raise error(
+                        f'Нет свободного соединения в пуле {self.alias} '
+                        f'за {self.timeout} с'
+                    )
+                self.waiting += 1
+                self._publish()
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            WAIT_DURATION.labels(self.alias).observe(monotonic() - started)
+            self.checked_out += 1
+            if self._idle:
+                connection, returned_at = self._idle.pop()
+                self._publish()
+                return connection, monotonic() - returned_at
+            self.opened += 1
+            self._publish()
+        try:
+            started = perf_counter()
+            connection = connect()
+            CONNECT_DURATION.labels(self.alias).observe(
+                perf_counter() - started
+            )
+        except BaseException:
+            self._release()
+            raise
+        return connection, None
+
+    def checkin(self, connection, reusable=True):
+        with self._condition:
+            if reusable and len(self._idle) < self.size:
+                self.checked_out -= 1
+                self._idle.append((connection, monotonic()))
+                self._publish()
+                self._condition.notify()
+                return
+        self._release()
+        connection.close()
+
+    def _release(self):
+        """Соединение закрыто: освобождается место для нового."""
+        with self._condition:
+            self.checked_out -= 1
+            self.opened -= 1
+            self._publish()
+            self._condition.notify()
+
+
+_pools = {}
+_pools_lock = Lock()
+
+
+def get_pool(alias, settings_dict):
+    """Пул псевдонима БД в текущем процессе.
+
+    Ключ включает pid, поэтому воркеры после fork не делят соединения
+    мастера.
+    """
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            options = settings_dict.get('POOL', {})
+            _pools[key] = ConnectionPool(
+                alias, size=options.get('SIZE', 5),
+                overflow=options.get('OVERFLOW', 5),
+                timeout=options.get('TIMEOUT', 10),
+            )
+        return _pools[key]
+
+
+class PooledDatabaseWrapperMixin:
+    """Подмешивается к DatabaseWrapper бэкенда.
+
+    Настройки пула берутся из ключа POOL в DATABASES: SIZE, OVERFLOW
+    и TIMEOUT.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def raw_connection_usable(self, connection):
+        try:
+            with closing(connection.cursor()) as cursor:
+                cursor.execute('SELECT 1')
+        except self.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        connect = partial(super().get_new_connection, conn_params)
+        while True:
+            connection, idle = self.pool.checkout(
+                connect, self.Database.OperationalError
+            )
+            if (
+                idle is None
+                or idle < HEALTH_CHECK_IDLE
+                or not self.settings_dict['CONN_HEALTH_CHECKS']
+                or self.raw_connection_usable(connection)
+            ):
+                return connection
+            self.pool.checkin(connection, reusable=False)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        reusable = True
+        try:
+            if not self.autocommit or self.in_atomic_block:
+                self.connection.rollback()
+        except self.Database.Error:
+            reusable = False
+        if reusable and self.errors_occurred:
+            reusable = self.raw_connection_usable(self.connection)
+        with self.wrap_database_errors:
+            self.pool.checkin(self.connection, reusable)
@@ -0,0 +1,79 @@
+"""Примеси моделей, общие для приложений recipes и users."""
+
+
+class CountersModelMixin:
+    """Полное сохранение не перезаписывает счетчики из counter_fields.
+
+    Счетчики меняются только через update() с F(), а в загруженном
+    объекте их значения могут устареть. Чтобы записать счетчик через
+    save(), его нужно явно указать в update_fields.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if (
+            update_fields is None and not args and not self._state.adding
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        return super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class TrackedFieldsMixin:
+    """Помнит значения tracked_fields, загруженные из БД.
+
+    changed_fields() в обработчиках post_save возвращает поля, значения
+    которых отличаются от загруженных. У нового объекта изменены все
+    отслеживаемые поля.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in instance._tracked_attnames()
+        }
+        return instance
+
+    def _tracked_attnames(self):
+        return {
+            self._meta.get_field(name).attname: name
+            for name in self.tracked_fields
+        }
+
+    def _current_value(self, name):
+        field = self._meta.get_field(name)
+        return field.get_prep_value(getattr(self, field.attname))
+
+    def changed_fields(self):
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return set(self.tracked_fields)
+        return {
+            name for attname, name in self._tracked_attnames().items()
+            # Отложенное поле, которому не присваивали значение, не менялось.
+            if attname in self.__dict__ and (
+                attname not in loaded
+                or self._current_value(name) != loaded[attname]
+            )
+        }
+
+    def save(self, *args, update_fields=None, **kwargs):
+        super().save(*args, update_fields=update_fields, **kwargs)
+        loaded = getattr(self, '_loaded_values', {})
+        for attname, name in self._tracked_attnames().items():
+            if attname in self.__dict__ and (
+                update_fields is None or name in update_fields
+            ):
+                loaded[attname] = self._current_value(name)
+        self._loaded_values = loaded
@@ -17,6 +17,7 @@ CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED_ORIGINS', '127.0.0.1, localhost')
 INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
+    'jobs.apps.JobsConfig',
     'users.apps.UsersConfig',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,9 +40,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.QueryProfileMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', 'foodgram.urls')
 
 TEMPLATES = [
     {
@@ -67,14 +70,32 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
     }
 }"""
 
+# С DB_POOL_SIZE > 0 соединения берутся из пула воркера и возвращаются
+# в него в конце запроса, иначе соединение живет DB_CONN_MAX_AGE секунд.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'foodgram.db.postgresql' if DB_POOL_SIZE
+            else 'django.db.backends.postgresql'
+        ),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL_SIZE else int(os.getenv('DB_CONN_MAX_AGE', 60))
+        ),
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+        ),
+        'POOL': {
+            'SIZE': DB_POOL_SIZE,
+            'OVERFLOW': int(os.getenv('DB_POOL_OVERFLOW', 5)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        },
     }
 }
 
@@ -121,6 +142,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': [
         'rest_framework.pagination.PageNumberPagination',
     ],
@@ -129,7 +154,44 @@ REST_FRAMEWORK = {
     ],
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Общие части представлений рецептов, см. api/fragments.py.
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'TIMEOUT': int(os.getenv('RECIPE_FRAGMENT_TIMEOUT', 86400)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('RECIPE_FRAGMENT_ENTRIES', 20000)),
+        },
+    },
+}
+
 AUTH_USER_MODEL = 'users.User'
 
 USERNAME_MAX_LENGTH = 150
 EMAIL_MAX_LENGTH = 254
+
+SHORT_LINK_SALT = int(os.getenv('SHORT_LINK_SALT', 20240710))
+SHORT_LINK_CACHE_SIZE = int(os.getenv('SHORT_LINK_CACHE_SIZE', 4096))
+
+# Сколько секунд хранится журнал DataChange; процесс, не читавший его
+# дольше, перестраивает кэш целиком.
+DATA_CHANGES_RETENTION = int(os.getenv('DATA_CHANGES_RETENTION', 3600))
+
+RENDITION_QUALITY = int(os.getenv('RENDITION_QUALITY', 80))
+RENDITION_CACHE_SIZE = int(os.getenv('RENDITION_CACHE_SIZE', 10000))
+
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', 2))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 1))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 5))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 10))
+JOBS_STALE_TIMEOUT = int(os.getenv('JOBS_STALE_TIMEOUT', 600))
+JOBS_REQUEUE_INTERVAL = int(os.getenv('JOBS_REQUEUE_INTERVAL', 60))
+
+SQL_PROFILING = os.getenv('SQL_PROFILING', 'false').lower() == 'true'
+SQL_PROFILING_REPEAT_LIMIT = int(os.getenv('SQL_PROFILING_REPEAT_LIMIT', 5))
+SQL_PROFILING_MAX_QUERIES = int(os.getenv('SQL_PROFILING_MAX_QUERIES', 20))
+SQL_PROFILING_BUFFER = int(os.getenv('SQL_PROFILING_BUFFER', 100))
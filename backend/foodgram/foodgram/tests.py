@@ -0,0 +1,78 @@
+from threading import Thread
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from foodgram.db.pool import ConnectionPool
+
+
+class PoolError(Exception):
+    pass
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """Выдача, переполнение и ожидание соединений пула."""
+
+    def setUp(self):
+        self.pool = ConnectionPool('test', size=1, overflow=1, timeout=0.05)
+        self.connect = mock.Mock(side_effect=lambda: mock.Mock())
+
+    def checkout(self):
+        return self.pool.checkout(self.connect, PoolError)
+
+    def test_idle_connection_reused(self):
+        connection, idle = self.checkout()
+        self.assertIsNone(idle)
+        self.pool.checkin(connection)
+        reused, idle = self.checkout()
+        self.assertIs(reused, connection)
+        self.assertGreaterEqual(idle, 0)
+        self.assertEqual(self.connect.call_count, 1)
+
+    def test_overflow_closed_on_checkin(self):
+        first, _ = self.checkout()
+        second, _ = self.checkout()
+        self.assertEqual(self.pool.opened, 2)
+        self.pool.checkin(first)
+        self.pool.checkin(second)
+        second.close.assert_called_once_with()
+        first.close.assert_not_called()
+        self.assertEqual(
+            (self.pool.opened, self.pool.checked_out), (1, 0)
+        )
+
+    def test_timeout(self):
+        self.checkout()
+        self.checkout()
+        with self.assertRaises(PoolError):
+            self.checkout()
+        self.assertEqual(self.pool.waiting, 0)
+        self.assertEqual(self.connect.call_count, 2)
+
+    def test_waiter_gets_returned_connection(self):
+        self.pool.timeout = 5
+        first, _ = self.checkout()
+        self.checkout()
+        result = []
+        waiter = Thread(target=lambda: result.append(self.checkout()))
+        waiter.start()
+        while not self.pool.waiting:
+            waiter.join(0.01)
+        self.pool.checkin(first)
+        waiter.join()
+        self.assertIs(result[0][0], first)
+        self.assertEqual(self.connect.call_count, 2)
+
+    def test_broken_connection_frees_slot(self):
+        first, _ = self.checkout()
+        self.checkout()
+        self.pool.checkin(first, reusable=False)
+        first.close.assert_called_once_with()
+        self.checkout()
+        self.assertEqual(self.pool.opened, 2)
+
+    def test_connect_error_frees_slot(self):
+        self.connect.side_effect = PoolError
+        with self.assertRaises(PoolError):
+            self.checkout()
+        self.assertEqual((self.pool.opened, self.pool.checked_out), (0, 0))
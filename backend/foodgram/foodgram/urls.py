@@ -3,12 +3,14 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import include, path
 
+from api.metrics import metrics
 from api.views import get_full_link
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('s/<str:short_link>/', get_full_link)
+    path('s/<str:short_link>/', get_full_link, name='short-link'),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
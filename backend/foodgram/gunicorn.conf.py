@@ -0,0 +1,28 @@
+"""Настройки gunicorn, читаются из рабочего каталога автоматически."""
+import os
+import shutil
+
+# С GUNICORN_ASGI=true приложение запускается через ASGI в воркерах
+# uvicorn, и частые запросы чтения обслуживаются асинхронно.
+if os.getenv('GUNICORN_ASGI', 'false').lower() == 'true':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi'
+
+# Воркеры наследуют окружение мастера, поэтому метрики всех процессов
+# пишутся в общий каталог и суммируются при выдаче /metrics.
+METRICS_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/foodgram-metrics'
+)
+
+
+def on_starting(server):
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
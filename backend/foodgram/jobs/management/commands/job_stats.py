@@ -0,0 +1,22 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    """Состояние очереди фоновых задач."""
+
+    help = 'Выводит глубину очереди и среднюю задержку запуска в JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes', type=int, default=60,
+            help='Окно для расчета задержки'
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(minutes=options['minutes'])
+        self.stdout.write(json.dumps(Job.objects.stats(since), indent=2))
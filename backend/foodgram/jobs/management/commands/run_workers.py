@@ -0,0 +1,110 @@
+import logging
+import signal
+import time
+from multiprocessing import Event, Process
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections, DatabaseError
+from jobs.queue import claim, requeue_stale, run
+
+logger = logging.getLogger(__name__)
+
+
+def work(stop, poll_interval, batch_size):
+    # Остановкой обработчиков управляет родительский процесс.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            jobs = claim(batch_size)
+            for job in jobs:
+                run(job)
+        except DatabaseError:
+            logger.exception('Ошибка базы данных в обработчике задач')
+            jobs = []
+        if not jobs:
+            stop.wait(poll_interval)
+
+
+class Command(BaseCommand):
+    """Запуск обработчиков фоновых задач."""
+
+    help = 'Запускает пул процессов, выполняющих задачи из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOBS_WORKERS
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOBS_POLL_INTERVAL
+        )
+        parser.add_argument('--batch-size', type=int, default=1)
+
+    def spawn(self, stop, options):
+        # Соединения нельзя разделять между процессами.
+        connections.close_all()
+        worker = Process(
+            target=work,
+            args=(stop, options['poll_interval'], options['batch_size'])
+        )
+        worker.start()
+        return worker
+
+    def requeue(self):
+        """Возвращает в очередь задачи обработчиков, упавших без ответа.
+
+        Задача считается зависшей, если выполняется дольше
+        JOBS_STALE_TIMEOUT, поэтому он должен превышать время самой
+        долгой задачи.
+        """
+        try:
+            requeued = requeue_stale(settings.JOBS_STALE_TIMEOUT)
+        except DatabaseError:
+            logger.exception('Ошибка базы данных при возврате задач')
+            return
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь задач: {requeued}')
+
+    def supervise(self, workers, stop, options):
+        """Перезапускает завершившиеся обработчики."""
+        for index, worker in enumerate(workers):
+            if not worker.is_alive():
+                logger.warning(
+                    'Обработчик %s завершился с кодом %s, перезапуск',
+                    worker.pid, worker.exitcode
+                )
+                workers[index] = self.spawn(stop, options)
+
+    def handle(self, *args, **options):
+        self.requeue()
+        stop = Event()
+        workers = [
+            self.spawn(stop, options) for _ in range(options['processes'])
+        ]
+        # Обработчик сигнала не трогает Event: его блокировку в этот момент
+        # может удерживать основной поток.
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+        self.stdout.write(self.style.SUCCESS(
+            f'Запущено обработчиков: {len(workers)}'
+        ))
+        next_requeue = time.monotonic() + settings.JOBS_REQUEUE_INTERVAL
+        try:
+            while not stopping:
+                time.sleep(1)
+                if stopping:
+                    break
+                if time.monotonic() >= next_requeue:
+                    self.requeue()
+                    next_requeue = (
+                        time.monotonic() + settings.JOBS_REQUEUE_INTERVAL
+                    )
+                self.supervise(workers, stop, options)
+        except KeyboardInterrupt:
+            pass
+        stop.set()
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,81 @@
+from django.db import models
+from django.db.models import Avg, Count, F, Min
+from django.utils import timezone
+
+
+class JobQuerySet(models.QuerySet):
+    """Запросы очереди задач."""
+
+    def stats(self, since=None):
+        """Глубина очереди по статусам и задержка запуска задач."""
+        now = timezone.now()
+        depth = dict(
+            self.values_list('status').annotate(total=Count('pk')).order_by()
+        )
+        oldest = self.filter(status=Job.Status.PENDING, run_at__lte=now)
+        oldest = oldest.aggregate(value=Min('run_at'))['value']
+        started = self.filter(started_at__isnull=False)
+        if since is not None:
+            started = started.filter(started_at__gte=since)
+        latency = started.aggregate(
+            value=Avg(F('started_at') - F('run_at'))
+        )['value']
+        return {
+            'depth': {status: depth.get(status, 0)
+                      for status in Job.Status.values},
+            'oldest_pending_seconds': (
+                (now - oldest).total_seconds() if oldest else 0
+            ),
+            'avg_latency_seconds': (
+                latency.total_seconds() if latency else 0
+            ),
+        }
+
+
+class Job(models.Model):
+    """Фоновая задача."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    name = models.CharField(verbose_name='Задача', max_length=255)
+    payload = models.JSONField(verbose_name='Аргументы', default=dict)
+    status = models.CharField(
+        verbose_name='Статус', max_length=16, choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попытки', default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток', default=5
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Запустить после', default=timezone.now
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Создана', auto_now_add=True
+    )
+    started_at = models.DateTimeField(
+        verbose_name='Запущена', null=True, blank=True
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Завершена', null=True, blank=True
+    )
+    last_error = models.TextField(verbose_name='Ошибка', blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'задачи'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_queue'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
@@ -0,0 +1,105 @@
+"""Очередь фоновых задач в базе данных."""
+import logging
+import traceback
+from datetime import timedelta
+from functools import wraps
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(func=None, *, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    Вызов func.enqueue(*args, **kwargs) ставит задачу в очередь после
+    фиксации текущей транзакции; аргументы должны сериализоваться в JSON.
+    """
+    if func is None:
+        return lambda func: task(func, max_attempts=max_attempts)
+    name = f'{func.__module__}.{func.__name__}'
+    registry[name] = func
+
+    @wraps(func)
+    def enqueue(*args, **kwargs):
+        job = Job(
+            name=name, payload={'args': args, 'kwargs': kwargs},
+            max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        )
+        transaction.on_commit(job.save)
+        return job
+
+    func.enqueue = enqueue
+    return func
+
+
+def get_task(name):
+    if name not in registry:
+        import_module(name.rsplit('.', 1)[0])
+    return registry[name]
+
+
+def claim(batch_size=1):
+    """Захватывает задачи, готовые к запуску.
+
+    В PostgreSQL строки блокируются SELECT ... FOR UPDATE SKIP LOCKED.
+    В SQLite такой блокировки нет, поэтому задачу забирает тот, чей
+    условный UPDATE по статусу изменил строку.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ready = Job.objects.filter(
+            status=Job.Status.PENDING, run_at__lte=now
+        ).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            ready = ready.select_for_update(skip_locked=True)
+        ids = list(ready.values_list('id', flat=True)[:batch_size])
+        claimed = [
+            pk for pk in ids
+            if Job.objects.filter(pk=pk, status=Job.Status.PENDING).update(
+                status=Job.Status.RUNNING, started_at=now
+            )
+        ]
+    return list(Job.objects.filter(pk__in=claimed))
+
+
+def run(job):
+    """Выполняет задачу, при ошибке откладывает повтор с ростом задержки."""
+    job.attempts += 1
+    try:
+        get_task(job.name)(
+            *job.payload.get('args', ()), **job.payload.get('kwargs', {})
+        )
+    except Exception:
+        job.last_error = traceback.format_exc()
+        logger.exception('Задача %s #%s завершилась с ошибкой',
+                         job.name, job.pk)
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.PENDING
+            job.run_at = timezone.now() + timedelta(
+                seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = Job.Status.DONE
+        job.finished_at = timezone.now()
+    job.save(update_fields=(
+        'attempts', 'status', 'run_at', 'finished_at', 'last_error'
+    ))
+
+
+def requeue_stale(timeout):
+    """Возвращает в очередь задачи упавших обработчиков."""
+    return Job.objects.filter(
+        status=Job.Status.RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=timeout),
+    ).update(status=Job.Status.PENDING, run_at=timezone.now())
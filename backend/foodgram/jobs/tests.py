@@ -0,0 +1,123 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from jobs.management.commands import run_workers
+from jobs.models import Job
+from jobs.queue import claim, requeue_stale, run, task
+
+calls = []
+
+
+@task(max_attempts=2)
+def flaky(fail):
+    calls.append(fail)
+    if fail:
+        raise ValueError('Ошибка задачи')
+
+
+class QueueTest(TestCase):
+    """Захват задач, повторы с ростом задержки и возврат зависших."""
+
+    def setUp(self):
+        calls.clear()
+
+    def create(self, fail=False, **kwargs):
+        return Job.objects.create(
+            name=f'{__name__}.flaky',
+            payload={'args': [fail], 'kwargs': {}}, **kwargs
+        )
+
+    def test_claim_order_and_status(self):
+        now = timezone.now()
+        later = self.create(run_at=now - timedelta(seconds=1))
+        first = self.create(run_at=now - timedelta(seconds=2))
+        self.create(run_at=now + timedelta(hours=1))
+        [job] = claim()
+        self.assertEqual(job, first)
+        self.assertEqual(job.status, Job.Status.RUNNING)
+        self.assertIsNotNone(job.started_at)
+        self.assertEqual(claim(5), [later])
+        self.assertEqual(claim(5), [])
+
+    def test_enqueue_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flaky.enqueue(False)
+            self.assertFalse(Job.objects.exists())
+        [job] = claim()
+        run(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(calls, [False])
+
+    def test_retry_backoff_then_failed(self):
+        job = self.create(fail=True, max_attempts=3)
+        delays = []
+        for _ in range(2):
+            [job] = claim()
+            started = timezone.now()
+            with self.assertLogs('jobs.queue', 'ERROR'):
+                run(job)
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.Status.PENDING)
+            self.assertIn('Ошибка задачи', job.last_error)
+            delays.append(round((job.run_at - started).total_seconds()))
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(
+            delays,
+            [settings.JOBS_RETRY_DELAY, settings.JOBS_RETRY_DELAY * 2]
+        )
+        [job] = claim()
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(claim(), [])
+
+    def test_requeue_stale(self):
+        now = timezone.now()
+        stale = self.create(
+            status=Job.Status.RUNNING, started_at=now - timedelta(hours=1)
+        )
+        running = self.create(status=Job.Status.RUNNING, started_at=now)
+        self.assertEqual(requeue_stale(600), 1)
+        stale.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(stale.status, Job.Status.PENDING)
+        self.assertEqual(running.status, Job.Status.RUNNING)
+        self.assertEqual(claim(5), [stale])
+
+
+class SupervisorTest(TestCase):
+    """run_workers перезапускает завершившиеся обработчики."""
+
+    def test_dead_workers_respawned(self):
+        alive, dead = mock.Mock(), mock.Mock(pid=2, exitcode=-9)
+        alive.is_alive.return_value = True
+        dead.is_alive.return_value = False
+        command = run_workers.Command(stdout=StringIO())
+        workers = [alive, dead]
+        with mock.patch.object(
+            run_workers, 'Process'
+        ) as process, self.assertLogs(run_workers.logger, 'WARNING'):
+            command.supervise(
+                workers, mock.Mock(), {'poll_interval': 1, 'batch_size': 1}
+            )
+        process.return_value.start.assert_called_once()
+        self.assertEqual(workers, [alive, process.return_value])
+
+    def test_periodic_requeue(self):
+        stale = Job.objects.create(
+            name='jobs.tests.flaky', status=Job.Status.RUNNING,
+            started_at=timezone.now() - timedelta(hours=1)
+        )
+        stdout = StringIO()
+        run_workers.Command(stdout=stdout).requeue()
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, Job.Status.PENDING)
+        self.assertIn('Возвращено в очередь задач: 1', stdout.getvalue())
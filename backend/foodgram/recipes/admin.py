@@ -32,15 +32,13 @@ class RecipeIngredientInline(admin.StackedInline):
 
 class RecipeAdmin(admin.ModelAdmin):
     inlines = [RecipeIngredientInline]
-    list_display = ('name', 'author', 'favorites_count')
+    list_display = ('name', 'author', 'favorites_count', 'in_carts_count')
     search_fields = ('name', 'author__username')
     list_filter = ('tags',)
     exclude = ('ingredients',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
     actions = [delete]
 
-    def favorites_count(self, obj):
-        return obj.favorite.count()
-
 
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
@@ -0,0 +1,53 @@
+"""Поддержка денормализованных счетчиков рецептов и авторов."""
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def change_counter(queryset, field, delta):
+    """Атомарно изменяет счетчик, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def insert_new(model, fields, rows, returning):
+    """Вставка без дубликатов; значения returning вставленных строк.
+
+    bulk_create(ignore_conflicts=True) не сообщает, какие строки
+    пропущены, поэтому счетчики по ней расходятся при параллельных
+    запросах. INSERT ... ON CONFLICT DO NOTHING RETURNING есть в
+    PostgreSQL и SQLite 3.35+.
+    """
+    if not rows:
+        return []
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(model._meta.get_field(field).column) for field in fields
+    )
+    values = ', '.join(
+        [f'({", ".join(["%s"] * len(fields))})'] * len(rows)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+            f'VALUES {values} ON CONFLICT DO NOTHING RETURNING '
+            f'{quote(model._meta.get_field(returning).column)}',
+            [value for row in rows for value in row]
+        )
+        return [value for value, in cursor.fetchall()]
+
+
+def count_subquery(model, field):
+    """Подзапрос с количеством строк model, ссылающихся на OuterRef('pk')."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def recount(model, field, related_model, related_field):
+    """Пересчитывает счетчик и возвращает число исправленных строк."""
+    actual = count_subquery(related_model, related_field)
+    return model.objects.exclude(**{field: actual}).update(**{field: actual})
@@ -0,0 +1,202 @@
+"""Обратный индекс ингредиентов для подбора рецептов по продуктам."""
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+from heapq import nsmallest
+from itertools import chain
+from threading import local, Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import RecipeIngredient
+from .versions import COMMIT_LAG, last_change_id, log_changes, recent_changes
+
+LOG_NAME = 'coverage-index'
+
+
+def ranking_key(row):
+    recipe_id, have, missing = row
+    return missing, -have, -recipe_id
+
+
+class Ranking(Sequence):
+    """Подходящие рецепты в порядке ranking_key.
+
+    Пагинатору нужны длина и одна страница, поэтому срез выбирает первые
+    строки через heapq.nsmallest без сортировки всех совпадений.
+    """
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(sorted(self._rows, key=ranking_key))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) and index.step in (None, 1) and (
+            index.stop is not None and index.stop >= 0
+            and (index.start or 0) >= 0
+        ):
+            return nsmallest(index.stop, self._rows, key=ranking_key)[index]
+        return sorted(self._rows, key=ranking_key)[index]
+
+
+class CoverageIndex:
+    """Ингредиент -> отсортированный массив id рецептов.
+
+    Строится при первом обращении в каждом процессе. Записи рецептов
+    попадают в журнал DataChange, и каждый процесс при чтении обновляет
+    в индексе только измененные рецепты. Индекс перестраивается целиком
+    после log_reset() или если журнал не читался дольше срока хранения.
+
+    Массивы postings не меняются на месте, обновление заменяет их новыми,
+    поэтому rank() читает ссылки, взятые под блокировкой.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._generation = 0
+        self._recipes = None
+        self._postings = None
+        self._last_id = 0
+        self._applied = set()
+        self._synced = None
+        self._pending = local()
+
+    def _build(self):
+        """Строит индекс вне блокировки и подменяет текущий."""
+        started = monotonic()
+        # Журнал читается до ингредиентов: изменения, записанные между
+        # этими запросами, применятся еще раз при следующем чтении.
+        last_id = last_change_id(LOG_NAME)
+        applied = {
+            change_id for change_id, _ in recent_changes(LOG_NAME, last_id)
+        }
+        recipes = {}
+        postings = {}
+        rows = RecipeIngredient.objects.order_by(
+            'recipe_id'
+        ).values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows.iterator(chunk_size=10_000):
+            recipes.setdefault(recipe_id, []).append(ingredient_id)
+            postings.setdefault(ingredient_id, array('l')).append(recipe_id)
+        recipes = {
+            recipe_id: tuple(ingredients)
+            for recipe_id, ingredients in recipes.items()
+        }
+        with self._lock:
+            if self._synced is not None and self._synced > started:
+                # Параллельная сборка начата позже и уже подменила индекс.
+                return
+            self._generation += 1
+            self._recipes = recipes
+            self._postings = postings
+            self._last_id = last_id
+            self._applied = applied
+            self._synced = started
+
+    def _sync(self):
+        """Применяет к индексу записи журнала, сделанные после чтения."""
+        with self._lock:
+            generation = self._generation
+            last_id = self._last_id
+            applied = self._applied
+        started = monotonic()
+        changes = recent_changes(LOG_NAME, last_id)
+        new = [
+            object_id for change_id, object_id in changes
+            if change_id not in applied
+        ]
+        if None in new:
+            return self._build()
+        current = {}
+        if new:
+            for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+                recipe_id__in=new
+            ).values_list('recipe_id', 'ingredient_id'):
+                current.setdefault(recipe_id, []).append(ingredient_id)
+        with self._lock:
+            if self._generation != generation:
+                # Индекс перестроен, журнал перечитается при следующем
+                # обращении.
+                return
+            self._patch(set(new), current)
+            self._last_id = max(
+                (change_id for change_id, _ in changes), default=last_id
+            )
+            self._applied = {change_id for change_id, _ in changes}
+            self._synced = started
+
+    def _patch(self, recipe_ids, current):
+        affected = set()
+        for recipe_id in recipe_ids:
+            affected.update(self._recipes.pop(recipe_id, ()))
+            ingredients = current.get(recipe_id)
+            if ingredients:
+                self._recipes[recipe_id] = tuple(ingredients)
+                affected.update(ingredients)
+        for ingredient_id in affected:
+            posting = {
+                recipe_id
+                for recipe_id in self._postings.get(ingredient_id, ())
+                if recipe_id not in recipe_ids
+            }
+            posting.update(
+                recipe_id for recipe_id in recipe_ids
+                if ingredient_id in current.get(recipe_id, ())
+            )
+            if posting:
+                self._postings[ingredient_id] = array('l', sorted(posting))
+            else:
+                self._postings.pop(ingredient_id, None)
+
+    def _load(self):
+        stale = settings.DATA_CHANGES_RETENTION - COMMIT_LAG.total_seconds()
+        if self._recipes is None or monotonic() - self._synced > stale:
+            self._build()
+        else:
+            self._sync()
+
+    def schedule(self, recipe_id):
+        """Записывает рецепт в журнал после коммита транзакции."""
+        pending = self._pending.__dict__.setdefault('recipe_ids', set())
+        pending.add(recipe_id)
+        transaction.on_commit(self._flush)
+
+    def _flush(self):
+        # Несколько сигналов одной транзакции сводятся к одной вставке.
+        recipe_ids = self._pending.__dict__.pop('recipe_ids', None)
+        if recipe_ids:
+            log_changes(LOG_NAME, recipe_ids)
+
+    def rank(self, ingredient_ids, max_missing=None):
+        """Рецепты с хотя бы одним из ингредиентов.
+
+        Возвращает Ranking из строк (id рецепта, есть, не хватает): сначала
+        рецепты, где не хватает меньше всего, затем где совпало больше.
+        """
+        self._load()
+        with self._lock:
+            recipes = self._recipes
+            postings = [
+                self._postings.get(ingredient_id, ())
+                for ingredient_id in set(ingredient_ids)
+            ]
+        have = Counter(chain.from_iterable(postings))
+        rows = []
+        for recipe_id, count in have.items():
+            # Рецепт может быть изменен в индексе во время подсчета.
+            missing = len(recipes.get(recipe_id, ())) - count
+            if missing < 0:
+                continue
+            if max_missing is None or missing <= max_missing:
+                rows.append((recipe_id, count, missing))
+        return Ranking(rows)
+
+
+coverage_index = CoverageIndex()
@@ -0,0 +1,83 @@
+"""Индекс ингредиентов в памяти для автодополнения."""
+from bisect import bisect_left
+from threading import Lock
+
+from .models import Ingredient
+from .versions import aget_version, get_version
+
+VERSION_NAME = 'ingredients'
+
+
+class IngredientIndex:
+    """Отсортированный массив названий для поиска по префиксу.
+
+    Строится при первом обращении в каждом процессе и перестраивается,
+    когда меняется версия 'ingredients' в БД: ее повышают сигналы
+    ингредиентов и команда load_data, в том числе из других процессов.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._keys = None
+        self._rows = None
+
+    def _cached(self, version):
+        with self._lock:
+            if version == self._version:
+                return self._keys, self._rows
+        return None
+
+    def _store(self, version, values):
+        rows = sorted(
+            (name.casefold(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in values
+        )
+        keys = [row[0] for row in rows]
+        with self._lock:
+            # Версия читается до данных: если данные успели измениться,
+            # новая версия перестроит индекс при следующем поиске.
+            self._version, self._keys, self._rows = version, keys, rows
+        return keys, rows
+
+    def _values(self):
+        return Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        )
+
+    def _load(self):
+        version = get_version(VERSION_NAME)
+        return self._cached(version) or self._store(version, self._values())
+
+    async def _aload(self):
+        version = await aget_version(VERSION_NAME)
+        return self._cached(version) or self._store(
+            version, [values async for values in self._values()]
+        )
+
+    def search(self, query, limit=None):
+        """Совпадения по префиксу, затем по подстроке."""
+        return self._match(*self._load(), query, limit)
+
+    async def asearch(self, query, limit=None):
+        return self._match(*await self._aload(), query, limit)
+
+    def _match(self, keys, rows, query, limit):
+        query = query.casefold()
+        start = end = bisect_left(keys, query)
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        matches = rows[start:end]
+        if limit is None or len(matches) < limit:
+            matches += [
+                row for row in rows[:start] + rows[end:] if query in row[0]
+            ]
+        if limit is not None:
+            matches = matches[:limit]
+        return [
+            Ingredient(id=pk, name=name, measurement_unit=measurement_unit)
+            for _, pk, name, measurement_unit in matches
+        ]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,131 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+from io import StringIO
+from time import monotonic, sleep
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_MIX = 'list=35,detail=30,autocomplete=15,taglist=10,shortlink=10'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    """Сравнение пропускной способности WSGI и ASGI."""
+
+    help = (
+        'Запускает gunicorn с синхронными воркерами и с воркерами uvicorn, '
+        'прогоняет loadtest по запросам чтения и сравнивает результаты.'
+    )
+    default_concurrency = 200
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=self.default_concurrency
+        )
+        parser.add_argument('--requests', type=int, default=4000)
+        parser.add_argument('--warmup', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Потоков в синхронном воркере gunicorn'
+        )
+        parser.add_argument('--mix', default=DEFAULT_MIX)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--startup-timeout', type=float, default=30)
+        parser.add_argument('--output', help='Файл для JSON-отчета')
+
+    def get_modes(self, options):
+        """Режимы сервера и переменные окружения для каждого."""
+        return {
+            'wsgi': {'GUNICORN_ASGI': 'false'},
+            'asgi': {'GUNICORN_ASGI': 'true'},
+        }
+
+    def start_server(self, env, port, options):
+        return subprocess.Popen(
+            (
+                sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                '--bind', f'127.0.0.1:{port}',
+                '--workers', str(options['workers']),
+                '--threads', str(options['threads']),
+                '--log-level', 'warning',
+            ),
+            cwd=settings.BASE_DIR, env={**os.environ, **env},
+            stdout=subprocess.DEVNULL
+        )
+
+    def wait_ready(self, process, url, timeout):
+        deadline = monotonic() + timeout
+        while monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError('gunicorn завершился при запуске')
+            try:
+                with urlopen(url + '/api/tags/', timeout=5) as response:
+                    response.read()
+                return
+            except OSError:
+                sleep(0.2)
+        raise CommandError(f'Сервер {url} не ответил за {timeout} с')
+
+    def loadtest(self, url, requests, options):
+        output = StringIO()
+        call_command(
+            'loadtest', url=url, requests=requests,
+            concurrency=options['concurrency'], mix=options['mix'],
+            seed=options['seed'], stdout=output
+        )
+        return json.loads(output.getvalue())
+
+    def run_mode(self, env, options):
+        port = free_port()
+        url = f'http://127.0.0.1:{port}'
+        process = self.start_server(env, port, options)
+        try:
+            self.wait_ready(process, url, options['startup_timeout'])
+            if options['warmup']:
+                # Индексы и кэши в памяти заполняются в каждом воркере.
+                self.loadtest(url, options['warmup'], options)
+            return self.loadtest(url, options['requests'], options)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def handle(self, *args, **options):
+        reports = {}
+        for mode, env in self.get_modes(options).items():
+            self.stdout.write(f'{mode}: {options["requests"]} запросов, '
+                              f'{options["concurrency"]} клиентов')
+            reports[mode] = self.run_mode(env, options)
+        modes = list(reports)
+        lines = [f'{"":18}' + ''.join(f'{mode:>12}' for mode in modes)]
+        for name, key in (
+            ('RPS', 'throughput_rps'), ('ошибки', 'errors')
+        ):
+            lines.append(f'{name:18}' + ''.join(
+                f'{reports[mode][key]:>12}' for mode in modes
+            ))
+        for share in ('p50_ms', 'p95_ms', 'p99_ms'):
+            lines.append(f'{share:18}' + ''.join(
+                f'{reports[mode]["latency"][share]:>12}' for mode in modes
+            ))
+        for kind in reports[modes[0]]['by_kind']:
+            lines.append(f'{kind + " p50":18}' + ''.join(
+                f'{reports[mode]["by_kind"][kind]["p50_ms"]:>12}'
+                for mode in modes
+            ))
+        self.stdout.write('\n'.join(lines))
+        if options['output']:
+            with open(options['output'], 'w', encoding='UTF-8') as file:
+                json.dump(reports, file, ensure_ascii=False, indent=2)
+                file.write('\n')
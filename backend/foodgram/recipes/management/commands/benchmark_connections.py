@@ -0,0 +1,33 @@
+from .benchmark_asgi import Command as ServerBenchmark
+
+# Дешевые запросы, где открытие соединения заметно в задержке.
+DEFAULT_MIX = 'detail=40,list=20,taglist=20,shortlink=20'
+
+
+class Command(ServerBenchmark):
+    """Задержка с новым, постоянным и пуловым соединением с БД."""
+
+    help = (
+        'Запускает gunicorn с CONN_MAX_AGE = 0, с постоянными соединениями '
+        'и с пулом соединений и сравнивает задержки loadtest.'
+    )
+    default_concurrency = 4
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(mix=DEFAULT_MIX, threads=4)
+        parser.add_argument(
+            '--pool-size', type=int, default=4,
+            help='DB_POOL_SIZE в режиме pool'
+        )
+
+    def get_modes(self, options):
+        sync = {'GUNICORN_ASGI': 'false', 'DB_POOL_SIZE': '0'}
+        return {
+            'fresh': {**sync, 'DB_CONN_MAX_AGE': '0'},
+            'persistent': {**sync, 'DB_CONN_MAX_AGE': '60'},
+            'pool': {
+                **sync, 'DB_POOL_SIZE': str(options['pool_size']),
+                'DB_POOL_OVERFLOW': '0',
+            },
+        }
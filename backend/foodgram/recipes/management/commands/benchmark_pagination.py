@@ -0,0 +1,97 @@
+from base64 import b64encode
+from statistics import median, quantiles
+from time import perf_counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+
+from api.views import RecipeViewSet, UserViewSet
+from recipes.management.commands.seed_scale import ensure_recipes
+from recipes.models import Recipe
+from users.models import User
+
+ENDPOINTS = {
+    'recipes': (RecipeViewSet, Recipe),
+    'users': (UserViewSet, User),
+}
+
+
+def make_cursor(position):
+    """Курсор DRF, указывающий на записи после заданного id."""
+    return b64encode(urlencode({'p': position}).encode()).decode()
+
+
+class Command(BaseCommand):
+    """Сравнение постраничного вывода по номеру страницы и по курсору."""
+
+    help = (
+        'Измеряет время первой и глубокой страницы списка в режимах '
+        '?page= и ?cursor=.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint', choices=ENDPOINTS, default='recipes'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=0,
+            help='Довести каталог до указанного размера через seed_scale'
+        )
+        parser.add_argument('--page', type=int, default=10_000)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def measure(self, view, params):
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(self.repeat):
+            request = factory.get(
+                '/', params, HTTP_HOST=settings.ALLOWED_HOSTS[0]
+            )
+            started = perf_counter()
+            response = view(request)
+            response.render()
+            timings.append((perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{params}: ответ {response.status_code}'
+                )
+        return timings
+
+    def report(self, title, timings):
+        self.stdout.write(
+            f'{title}: p50 {median(timings):.1f} мс, '
+            f'p95 {quantiles(timings, n=20)[-1]:.1f} мс'
+        )
+
+    def handle(self, *args, **options):
+        if options['recipes']:
+            ensure_recipes(options['recipes'], self.stdout)
+        viewset, model = ENDPOINTS[options['endpoint']]
+        view = viewset.as_view({'get': 'list'})
+        self.repeat = options['repeat']
+        limit, page = options['limit'], options['page']
+        offset = (page - 1) * limit
+        ids = model.objects.order_by('-id').values_list('id', flat=True)
+        total = ids.count()
+        if offset >= total:
+            raise CommandError(
+                f'Для страницы {page} нужно больше {offset} записей, '
+                f'а в базе {total}'
+            )
+        self.stdout.write(f'Записей: {total}')
+        self.report('page=1', self.measure(
+            view, {'page': 1, 'limit': limit}
+        ))
+        self.report(f'page={page}', self.measure(
+            view, {'page': page, 'limit': limit}
+        ))
+        self.report('cursor, первая страница', self.measure(
+            view, {'cursor': '', 'limit': limit}
+        ))
+        cursor = make_cursor(ids[offset - 1]) if offset else ''
+        self.report(f'cursor, страница {page}', self.measure(
+            view, {'cursor': cursor, 'limit': limit}
+        ))
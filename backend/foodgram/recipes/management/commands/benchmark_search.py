@@ -0,0 +1,45 @@
+from statistics import median, quantiles
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from recipes.management.commands.seed_scale import ensure_recipes
+from recipes.models import Recipe
+from recipes.search import search_recipes
+
+DEFAULT_QUERIES = ('борщ', 'курица с рисом', 'сыр', 'шоколадный торт')
+
+
+class Command(BaseCommand):
+    """Замер задержки полнотекстового поиска рецептов."""
+
+    help = (
+        'Измеряет время поиска по рецептам, при необходимости создавая '
+        'синтетический каталог.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=0,
+            help='Довести каталог до указанного размера через seed_scale'
+        )
+        parser.add_argument('--query', action='append', dest='queries')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=6)
+
+    def handle(self, *args, **options):
+        if options['recipes']:
+            ensure_recipes(options['recipes'], self.stdout)
+        self.stdout.write(f'Рецептов в каталоге: {Recipe.objects.count()}')
+        for query in options['queries'] or DEFAULT_QUERIES:
+            timings = []
+            for _ in range(options['repeat']):
+                started = perf_counter()
+                page = search_recipes(Recipe.objects.all(), query)
+                found = page.count()
+                list(page[:options['page_size']])
+                timings.append((perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{query!r}: найдено {found}, '
+                f'p50 {median(timings):.1f} мс, '
+                f'p95 {quantiles(timings, n=20)[-1]:.1f} мс'
+            )
@@ -0,0 +1,193 @@
+from statistics import median
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch, Value, prefetch_related_objects
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api import fast_serializers
+from api.renderers import ORJSONRenderer
+from api.serializers import (
+    CustomUserSerializer,
+    RecipeGetSerializer,
+    ShortRecipeSerializer,
+    SubscriptionSerializer
+)
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Сравнение сериализаторов DRF и api.fast_serializers."""
+
+    help = (
+        'Проверяет, что быстрые представления побайтно совпадают '
+        'с сериализаторами DRF, и измеряет время на один объект.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def make_request(self, user):
+        request = Request(APIRequestFactory().get(
+            '/', HTTP_HOST=settings.ALLOWED_HOSTS[0]
+        ))
+        request.user = user
+        return request
+
+    def recipes(self, request):
+        return list(Recipe.objects.with_related().with_user_flags(
+            request.user
+        )[:self.items])
+
+    def drf_recipes(self, request):
+        recipes = self.recipes(request)
+        started = perf_counter()
+        prefetch_related_objects(
+            recipes, 'tags', 'recipe_ingredients__ingredient'
+        )
+        serializer = RecipeGetSerializer(context={'request': request})
+        data = [serializer.field_representation(recipe) for recipe in recipes]
+        return perf_counter() - started, data
+
+    def fast_recipes(self, request):
+        recipes = self.recipes(request)
+        started = perf_counter()
+        serializer = RecipeGetSerializer(context={'request': request})
+        data = [
+            serializer.overlay(fragment, recipe) for fragment, recipe in zip(
+                serializer.shared_representations(recipes), recipes
+            )
+        ]
+        return perf_counter() - started, data
+
+    def users(self, request):
+        return list(User.objects.all()[:self.items])
+
+    def drf_users(self, request):
+        users = self.users(request)
+        started = perf_counter()
+        data = CustomUserSerializer(
+            users, many=True, context={'request': request}
+        ).data
+        return perf_counter() - started, data
+
+    def fast_users(self, request):
+        users = self.users(request)
+        started = perf_counter()
+        data = fast_serializers.users_data(users, request)
+        return perf_counter() - started, data
+
+    def subscriptions(self, request):
+        """Выборка как в UserViewSet.subscriptions с recipes_limit=3."""
+        return list(User.objects.filter(
+            following__user=request.user
+        ).annotate(is_subscribed=Value(True)).prefetch_related(Prefetch(
+            'recipes', queryset=Recipe.objects.all()[:3],
+            to_attr='short_recipes'
+        ))[:self.items])
+
+    def drf_subscriptions(self, request):
+        authors = self.subscriptions(request)
+        started = perf_counter()
+        data = SubscriptionSerializer(
+            authors, many=True, context={'request': request}
+        ).data
+        return perf_counter() - started, data
+
+    def fast_subscriptions(self, request):
+        authors = self.subscriptions(request)
+        started = perf_counter()
+        data = fast_serializers.subscriptions_data(authors, request)
+        return perf_counter() - started, data
+
+    def drf_short_recipes(self, request):
+        recipes = self.recipes(request)
+        started = perf_counter()
+        data = ShortRecipeSerializer(
+            recipes, many=True, context={'request': request}
+        ).data
+        return perf_counter() - started, data
+
+    def fast_short_recipes(self, request):
+        recipes = self.recipes(request)
+        started = perf_counter()
+        data = [
+            fast_serializers.short_recipe_data(recipe, request)
+            for recipe in recipes
+        ]
+        return perf_counter() - started, data
+
+    def measure(self, name, request):
+        """Медиана времени на объект и вывод DRF и быстрого пути."""
+        timings = {}
+        outputs = {}
+        for kind in ('drf', 'fast'):
+            method = getattr(self, f'{kind}_{name}')
+            runs = [method(request) for _ in range(self.repeat)]
+            outputs[kind] = runs[-1][1]
+            count = max(1, len(outputs[kind]))
+            timings[kind] = median(elapsed for elapsed, _ in runs) / count
+        return timings, outputs
+
+    def compare(self, name, outputs):
+        renderer = JSONRenderer()
+        for expected, actual in zip(outputs['drf'], outputs['fast']):
+            if renderer.render(expected) != renderer.render(actual):
+                raise CommandError(
+                    f'{name}: представление объекта {expected["id"]} '
+                    f'отличается от DRF'
+                )
+        if len(outputs['drf']) != len(outputs['fast']):
+            raise CommandError(f'{name}: разное число объектов')
+
+    def measure_renderers(self, data):
+        timings = {}
+        rendered = {}
+        for name, renderer in (
+            ('drf', JSONRenderer()), ('fast', ORJSONRenderer())
+        ):
+            runs = []
+            for _ in range(self.repeat):
+                started = perf_counter()
+                rendered[name] = renderer.render(data)
+                runs.append(perf_counter() - started)
+            timings[name] = median(runs) / max(1, len(data))
+        if rendered['drf'] != rendered['fast']:
+            raise CommandError('ORJSONRenderer: вывод отличается')
+        return timings
+
+    def report(self, name, timings):
+        self.stdout.write(
+            f'{name:24} DRF {timings["drf"] * 1e6:8.1f} мкс/объект, '
+            f'быстрый {timings["fast"] * 1e6:8.1f} мкс/объект, '
+            f'x{timings["drf"] / timings["fast"]:.1f}'
+        )
+
+    def handle(self, *args, **options):
+        self.items = options['items']
+        self.repeat = options['repeat']
+        subscriber = User.objects.filter(follower__isnull=False).first()
+        if subscriber is None or not Recipe.objects.exists():
+            raise CommandError('Нет рецептов или подписок: seed_scale')
+        for user in (AnonymousUser(), subscriber):
+            request = self.make_request(user)
+            self.stdout.write(
+                'Аноним' if user.is_anonymous else f'Пользователь {user.pk}'
+            )
+            names = ['recipes', 'users', 'short_recipes']
+            if not user.is_anonymous:
+                names.append('subscriptions')
+            for name in names:
+                timings, outputs = self.measure(name, request)
+                self.compare(name, outputs)
+                self.report(name, timings)
+            self.report('JSON, рецепты', self.measure_renderers(
+                self.measure('recipes', request)[1]['drf']
+            ))
+        self.stdout.write('Вывод совпадает с DRF')
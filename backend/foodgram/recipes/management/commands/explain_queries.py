@@ -0,0 +1,191 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+
+from recipes.management.commands.seed_scale import ensure_recipes
+from recipes.models import Recipe, Tag
+from users.models import User
+
+ENDPOINTS = (
+    '/api/recipes/',
+    '/api/recipes/?cursor=',
+    '/api/recipes/?cursor=&tags={tag}',
+    '/api/recipes/?author={author}',
+    '/api/recipes/?tags={tag}',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/recipes/{recipe}/',
+    '/api/recipes/download_shopping_cart/',
+    '/api/users/subscriptions/?recipes_limit=3',
+    '/api/users/{author}/',
+)
+ALIAS = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX .*)?$')
+SQLITE_LOOP = re.compile(r'^(?:SCAN|SEARCH) ')
+SQLITE_BLOCK = re.compile(
+    r'^(?:CO-ROUTINE|MATERIALIZE|(?:CORRELATED )?(?:SCALAR|LIST) SUBQUERY)'
+)
+SQLITE_SUBQUERY = re.compile(r'^(?:CORRELATED )?(?:SCALAR|LIST) SUBQUERY')
+# COUNT(*) и MAX() по всей таблице без условий: номера страниц требуют
+# числа всех записей, это обходит только ?cursor=.
+WHOLE_TABLE_AGGREGATE = re.compile(
+    r'^SELECT (?:(?:COUNT|MAX)\([^()]*\)(?: AS "\w+")?(?:, )?)+ FROM "\w+"$'
+)
+# Подзапрос во FROM, которым Django оборачивает агрегаты по срезу.
+DERIVED = re.compile(r'FROM \((SELECT .*)\) subquery$', re.S)
+OUTER_LIMIT = re.compile(r'\sLIMIT \d+(?: OFFSET \d+)?\s*$')
+
+
+class Command(BaseCommand):
+    """Проверка планов запросов основных эндпоинтов."""
+
+    help = (
+        'Выполняет основные запросы API под EXPLAIN и завершается с '
+        'ошибкой, если большая таблица читается полным перебором.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=0,
+            help='Довести каталог до указанного размера через seed_scale'
+        )
+        parser.add_argument(
+            '--min-rows', type=int, default=10_000,
+            help='Таблицы с меньшим числом строк не проверяются'
+        )
+        parser.add_argument('--verbose-plans', action='store_true')
+
+    def large_tables(self, min_rows):
+        tables = set()
+        with connection.cursor() as cursor:
+            for table in connection.introspection.django_table_names(
+                only_existing=True
+            ):
+                cursor.execute(
+                    'SELECT COUNT(*) FROM '
+                    + connection.ops.quote_name(table)
+                )
+                if cursor.fetchone()[0] >= min_rows:
+                    tables.add(table)
+        return tables
+
+    def explain(self, sql, params):
+        """План запроса и таблицы, читаемые полным перебором."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+                plan = cursor.fetchone()[0][0]['Plan']
+                nodes, scans = [plan], set()
+                while nodes:
+                    node = nodes.pop()
+                    nodes.extend(node.get('Plans', ()))
+                    if node['Node Type'] == 'Seq Scan':
+                        scans.add(node['Relation Name'])
+                return str(plan), scans
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            rows = cursor.fetchall()
+        details = [detail for _, _, _, detail in rows]
+        aliases = dict(
+            (alias, table) for table, alias in ALIAS.findall(sql)
+        )
+        # EXPLAIN QUERY PLAN - дерево узлов (id, parent). Внешний запрос
+        # (блок 0) и подзапрос во FROM (CO-ROUTINE или MATERIALIZE) -
+        # отдельные блоки. Ведущий цикл блока с собственным LIMIT и без
+        # сортировки во временном B-дереве читает только первые строки.
+        # Коррелированные подзапросы выполняются для каждой строки, их
+        # LIMIT 1 из Exists() перебор не ограничивает.
+        derived = DERIVED.search(sql)
+        limited = {0: bool(OUTER_LIMIT.search(sql))}
+        parents = {node: parent for node, parent, _, _ in rows}
+        headers = {}
+        for node, _, _, detail in rows:
+            if SQLITE_BLOCK.match(detail):
+                headers[node] = bool(
+                    derived and not SQLITE_SUBQUERY.match(detail)
+                    and OUTER_LIMIT.search(derived[1])
+                )
+        limited.update(headers)
+
+        def block(node):
+            node = parents[node]
+            while node and node not in headers:
+                node = parents.get(node, 0)
+            return node
+
+        leading = {}
+        for node, parent, _, detail in rows:
+            key = block(node)
+            if 'TEMP B-TREE' in detail:
+                limited[key] = False
+            elif SQLITE_LOOP.match(detail) and parent == key:
+                leading.setdefault(key, node)
+        scans = set()
+        for node, _, _, detail in rows:
+            match = SQLITE_SCAN.match(detail)
+            if match is None:
+                continue
+            key = block(node)
+            if limited[key] and leading.get(key) == node:
+                continue
+            scans.add(aliases.get(match[1], match[1]))
+        return '\n'.join(details), scans
+
+    def handle(self, *args, **options):
+        if options['recipes']:
+            ensure_recipes(options['recipes'], self.stdout)
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+        large = self.large_tables(options['min_rows'])
+        self.stdout.write(f'Большие таблицы: {", ".join(sorted(large))}')
+        # Самый активный автор с избранным и корзиной: эндпоинты
+        # с флагами читают его строки.
+        author = User.objects.filter(
+            favorite__isnull=False, shopping_cart__isnull=False
+        ).order_by('-recipes_count').first()
+        recipe = Recipe.objects.filter(author=author).first()
+        tag = Tag.objects.first()
+        if recipe is None or tag is None:
+            raise CommandError('Нужна база с рецептами и тегами: --recipes')
+        client = APIClient(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        client.force_authenticate(author)
+        statements = []
+
+        def capture(execute, sql, params, many, context):
+            statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        failures = 0
+        for path in ENDPOINTS:
+            path = path.format(
+                author=author.pk, recipe=recipe.pk, tag=tag.slug
+            )
+            statements.clear()
+            with connection.execute_wrapper(capture):
+                response = client.get(path)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.stdout.write(f'{path}: {response.status_code}')
+            for sql, params in statements:
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                plan, scans = self.explain(sql, params)
+                scans &= large
+                if scans and WHOLE_TABLE_AGGREGATE.match(sql):
+                    self.stdout.write(
+                        f'  Подсчет всех строк: {", ".join(sorted(scans))}'
+                    )
+                    continue
+                if options['verbose_plans'] or scans:
+                    self.stdout.write(f'  {sql}\n  {plan}')
+                if scans:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(
+                        f'  Полный перебор: {", ".join(sorted(scans))}'
+                    ))
+        if failures:
+            raise CommandError(f'Запросов с полным перебором: {failures}')
+        self.stdout.write(self.style.SUCCESS('Полных переборов нет'))
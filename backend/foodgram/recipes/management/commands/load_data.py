@@ -1,17 +1,162 @@
+import json
 from csv import reader
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import Ingredient
+from recipes.versions import bump_version
+
+DEFAULT_PATH = Path(__file__).resolve().parents[2] / 'data' / 'ingredients.csv'
+CHUNK_SIZE = 64 * 1024
+
+
+class RowError(ValueError):
+    """Строка или элемент файла, которые нельзя загрузить."""
+
+    def __init__(self, where, message):
+        super().__init__(message)
+        self.where = where
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """Элементы JSON-массива по одному, файл читается частями."""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+
+    def skip_spaces():
+        nonlocal buffer, position, eof
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or eof:
+                return buffer[position:position + 1]
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+
+    if skip_spaces() != '[':
+        raise RowError('начало файла', 'ожидался массив JSON')
+    position += 1
+    if skip_spaces() == ']':
+        return
+    index = 0
+    while True:
+        index += 1
+        skip_spaces()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                if eof:
+                    raise RowError(
+                        f'элемент {index}', f'некорректный JSON: {error.msg}'
+                    )
+            else:
+                # Число на границе части может продолжаться в следующей.
+                if end < len(buffer) or eof:
+                    break
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+        position = end
+        yield index, item
+        separator = skip_spaces()
+        position += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise RowError(
+                f'элемент {index}', 'после элемента ожидалась запятая или ]'
+            )
 
 
 class Command(BaseCommand):
     """Добавление ингредиентов в БД."""
 
-    def handle(self, *args, **kwargs):
-        path = 'recipes/data/ingredients.csv'
-        with open(path, 'r', encoding='UTF-8') as ingredients:
-            for row in reader(ingredients):
-                Ingredient.objects.get_or_create(
-                    name=row[0], measurement_unit=row[1],
+    help = 'Загружает ингредиенты из CSV или JSON пакетами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=DEFAULT_PATH, type=Path)
+        parser.add_argument(
+            '--format', choices=('csv', 'json'),
+            help='По умолчанию определяется по расширению файла'
+        )
+        parser.add_argument('--batch-size', default=1000, type=int)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def read_csv(self, file):
+        rows = reader(file)
+        for row in rows:
+            if not any(value.strip() for value in row):
+                continue
+            if len(row) < 2:
+                raise RowError(
+                    f'строка {rows.line_num}',
+                    'ожидались название и единица измерения'
+                )
+            yield row[0].strip(), row[1].strip()
+
+    def read_json(self, file):
+        for index, item in iter_json_array(file):
+            try:
+                yield item['name'].strip(), item['measurement_unit'].strip()
+            except (KeyError, TypeError, AttributeError):
+                raise RowError(
+                    f'элемент {index}',
+                    'ожидался объект с name и measurement_unit'
+                )
+
+    def unique_rows(self, rows):
+        seen = set()
+        for row in rows:
+            if row[0] and row not in seen:
+                seen.add(row)
+                yield row
+
+    def handle(self, *args, **options):
+        path = options['file']
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'json'):
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        batch_size = options['batch_size']
+        started = perf_counter()
+        before = Ingredient.objects.count()
+        total = 0
+        try:
+            # Файл с ошибкой не загружается частично.
+            with open(path, 'r', encoding='UTF-8') as file, \
+                    transaction.atomic():
+                rows = self.unique_rows(
+                    getattr(self, f'read_{file_format}')(file)
                 )
-        self.stdout.write(self.style.SUCCESS('Ингредиенты загружены в БД'))
+                while batch := list(islice(rows, batch_size)):
+                    total += len(batch)
+                    if options['dry_run']:
+                        continue
+                    Ingredient.objects.bulk_create(
+                        [
+                            Ingredient(name=name, measurement_unit=unit)
+                            for name, unit in batch
+                        ],
+                        ignore_conflicts=True,
+                    )
+        except FileNotFoundError:
+            raise CommandError(f'Файл не найден: {path}')
+        except UnicodeDecodeError as error:
+            raise CommandError(f'{path}: файл не в кодировке UTF-8: {error}')
+        except RowError as error:
+            raise CommandError(f'{path}, {error.where}: {error}')
+        created = Ingredient.objects.count() - before
+        if created:
+            # bulk_create не отправляет сигналы post_save.
+            bump_version('ingredients')
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиенты загружены в БД: прочитано {total}, '
+            f'добавлено {created} за {elapsed:.2f} с '
+            f'({total / elapsed:.0f} строк/с)'
+            + (' [dry-run]' if options['dry_run'] else '')
+        ))
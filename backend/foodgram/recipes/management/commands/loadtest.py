@@ -0,0 +1,279 @@
+import json
+import random
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from threading import local
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from recipes import short_links
+from recipes.management.commands.seed_scale import SEED_DOMAIN
+from recipes.models import Ingredient, Recipe, ShoppingCart, ShortLink, Tag
+from users.models import User
+
+DEFAULT_MIX = 'list=40,detail=30,tags=15,subscriptions=10,cart=5'
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+SHORT_LINKS = 1000
+
+
+class NoRedirect(HTTPRedirectHandler):
+    """Редирект короткой ссылки измеряется сам по себе."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+opener = build_opener(NoRedirect)
+
+
+def percentile(values, share):
+    """Значение по методу ближайшего ранга для отсортированного списка."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, round(share * len(values)) - 1))
+    return round(values[index], 2)
+
+
+def summary(timings):
+    timings = sorted(timings)
+    return {
+        'count': len(timings),
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'), capture_output=True,
+            text=True, check=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class QueryCounter:
+    """Число SQL-запросов за время обработки запроса."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """Нагрузочный прогон по смеси запросов к API."""
+
+    help = (
+        'Выполняет взвешенную смесь запросов через тестовый клиент или '
+        'к запущенному серверу и выводит задержки, пропускную способность '
+        'и число SQL-запросов в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help=f'Веса видов запросов, по умолчанию {DEFAULT_MIX}'
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера; без него запросы идут через '
+                 'тестовый клиент Django в этом процессе'
+        )
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Файл для JSON-отчета')
+
+    def parse_mix(self, mix):
+        try:
+            weights = {
+                name: int(weight) for name, weight in (
+                    part.split('=') for part in mix.split(',')
+                )
+            }
+        except ValueError:
+            raise CommandError(f'Неверный формат --mix: {mix}')
+        unknown = set(weights) - set(self.paths)
+        if unknown:
+            raise CommandError(f'Неизвестные виды запросов: {unknown}')
+        return weights
+
+    def prepare(self, options):
+        users = list(User.objects.filter(
+            email__endswith='@' + SEED_DOMAIN
+        ).order_by('?').values_list('id', flat=True)[:options['users']])
+        if not users:
+            raise CommandError('Нет синтетических данных: seed_scale')
+        self.tokens = [
+            Token.objects.get_or_create(user_id=user_id)[0].key
+            for user_id in users
+        ]
+        self.cart_tokens = [
+            Token.objects.get_or_create(user_id=user_id)[0].key
+            for user_id in ShoppingCart.objects.filter(
+                user__in=users
+            ).values_list('user', flat=True).distinct()
+        ] or self.tokens
+        self.recipes = list(Recipe.objects.values_list('id', flat=True))
+        self.tags = list(Tag.objects.values_list('slug', flat=True))
+        self.pages = max(1, min(len(self.recipes) // 6, 50))
+        self.ingredients = list(
+            Ingredient.objects.values_list('name', flat=True)
+        )
+        linked = random.Random(options['seed']).sample(
+            self.recipes, min(SHORT_LINKS, len(self.recipes))
+        )
+        ShortLink.objects.bulk_create([
+            ShortLink(recipe_id=pk, code=short_links.encode(pk))
+            for pk in linked
+        ], ignore_conflicts=True)
+        self.short_codes = list(ShortLink.objects.filter(
+            recipe_id__in=linked
+        ).values_list('code', flat=True))
+
+    @property
+    def paths(self):
+        return {
+            'list': self.list_path,
+            'detail': self.detail_path,
+            'tags': self.tags_path,
+            'subscriptions': self.subscriptions_path,
+            'cart': self.cart_path,
+            'autocomplete': self.autocomplete_path,
+            'taglist': self.taglist_path,
+            'shortlink': self.shortlink_path,
+        }
+
+    def list_path(self, rng):
+        return f'/api/recipes/?page={rng.randint(1, self.pages)}', None
+
+    def detail_path(self, rng):
+        return f'/api/recipes/{rng.choice(self.recipes)}/', None
+
+    def tags_path(self, rng):
+        tags = rng.sample(self.tags, min(2, len(self.tags)))
+        return '/api/recipes/?' + '&'.join(f'tags={t}' for t in tags), None
+
+    def subscriptions_path(self, rng):
+        return '/api/users/subscriptions/?recipes_limit=3', None
+
+    def cart_path(self, rng):
+        return (
+            '/api/recipes/download_shopping_cart/',
+            rng.choice(self.cart_tokens)
+        )
+
+    def autocomplete_path(self, rng):
+        prefix = rng.choice(self.ingredients)[:rng.randint(1, 3)]
+        return f'/api/ingredients/?name={quote(prefix)}', None
+
+    def taglist_path(self, rng):
+        return '/api/tags/', None
+
+    def shortlink_path(self, rng):
+        return f'/s/{rng.choice(self.short_codes)}/', None
+
+    def client_request(self, path, token):
+        """Запрос через тестовый клиент со счетчиком SQL-запросов."""
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        counter = QueryCounter()
+        started = perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.local.client.get(
+                path, HTTP_AUTHORIZATION=f'Token {token}'
+            )
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return perf_counter() - started, response.status_code, counter.count
+
+    def server_request(self, path, token):
+        """Запрос к серверу; число запросов берется из Server-Timing."""
+        request = Request(
+            self.base_url + path, headers={'Authorization': f'Token {token}'}
+        )
+        started = perf_counter()
+        try:
+            with opener.open(request) as response:
+                response.read()
+                status, headers = response.status, response.headers
+        except HTTPError as error:
+            error.read()
+            status, headers = error.code, error.headers
+        elapsed = perf_counter() - started
+        match = SERVER_TIMING_QUERIES.search(
+            headers.get('Server-Timing', '')
+        )
+        return elapsed, status, int(match[1]) if match else None
+
+    def run_one(self, kind, path, token):
+        elapsed, status, queries = self.send(path, token)
+        return kind, elapsed * 1000, status, queries
+
+    def handle(self, *args, **options):
+        self.prepare(options)
+        weights = self.parse_mix(options['mix'])
+        self.local = local()
+        if options['url']:
+            self.base_url = options['url'].rstrip('/')
+            self.send = self.server_request
+        else:
+            self.send = self.client_request
+        rng = random.Random(options['seed'])
+        kinds = rng.choices(
+            list(weights), weights=list(weights.values()),
+            k=options['requests']
+        )
+        plan = []
+        for kind in kinds:
+            path, token = self.paths[kind](rng)
+            plan.append((kind, path, token or rng.choice(self.tokens)))
+        started = perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(
+                lambda item: self.run_one(*item), plan
+            ))
+        duration = perf_counter() - started
+        by_kind = {}
+        for kind, elapsed, status, queries in results:
+            by_kind.setdefault(kind, []).append((elapsed, status, queries))
+        report = {
+            'commit': current_commit(),
+            'mode': 'server' if options['url'] else 'test-client',
+            'requests': len(results),
+            'concurrency': options['concurrency'],
+            'duration_s': round(duration, 2),
+            'throughput_rps': round(len(results) / duration, 1),
+            'errors': sum(status >= 400 for _, _, status, _ in results),
+            'latency': summary([elapsed for _, elapsed, _, _ in results]),
+            'by_kind': {},
+        }
+        for kind, rows in sorted(by_kind.items()):
+            queries = [count for _, _, count in rows if count is not None]
+            report['by_kind'][kind] = {
+                **summary([elapsed for elapsed, _, _ in rows]),
+                'errors': sum(status >= 400 for _, status, _ in rows),
+                'queries_avg': (
+                    round(sum(queries) / len(queries), 1) if queries else None
+                ),
+            }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='UTF-8') as file:
+                file.write(output + '\n')
+        self.stdout.write(output)
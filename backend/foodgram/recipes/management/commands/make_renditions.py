@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from recipes import renditions
+from recipes.models import Recipe
+from users.models import User
+
+SOURCES = (
+    (Recipe, 'image', ('card', 'detail')),
+    (User, 'avatar', ('avatar',)),
+)
+
+
+class Command(BaseCommand):
+    """Создание копий изображений для уже загруженных файлов."""
+
+    help = 'Создает уменьшенные копии изображений рецептов и аватаров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать уже существующие копии'
+        )
+
+    def handle(self, *args, **options):
+        for model, field, sizes in SOURCES:
+            created = failed = 0
+            names = model.objects.exclude(**{f'{field}__in': ('', None)})
+            for obj in names.only(field).iterator():
+                field_file = getattr(obj, field)
+                todo = (
+                    sizes if options['force']
+                    else renditions.missing_sizes(field_file, sizes)
+                )
+                if not todo:
+                    continue
+                try:
+                    renditions.generate(field_file.storage, field_file.name,
+                                        todo)
+                    created += 1
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{field_file.name}: {error}')
+                    continue
+                # Как в recipes.tasks.make_renditions: новые ETag
+                # и фрагменты рецептов получат ссылки на копии.
+                name = field_file.name
+                Recipe.objects.filter(
+                    Q(image=name) | Q(author__avatar=name)
+                ).touch()
+            self.stdout.write(
+                f'{model.__name__}.{field}: обработано {created}, '
+                f'ошибок {failed}'
+            )
+        self.stdout.write(self.style.SUCCESS('Копии изображений созданы'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from recipes.counters import recount
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+)
+
+
+class Command(BaseCommand):
+    """Пересчет денормализованных счетчиков."""
+
+    help = 'Исправляет расхождения счетчиков избранного, корзин и рецептов.'
+
+    def handle(self, *args, **kwargs):
+        for model, field, related_model, related_field in COUNTERS:
+            fixed = recount(model, field, related_model, related_field)
+            self.stdout.write(
+                f'{model.__name__}.{field}: исправлено строк {fixed}'
+            )
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
@@ -0,0 +1,239 @@
+import random
+from itertools import accumulate
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.authtoken.models import Token
+
+from recipes.coverage_index import LOG_NAME
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag
+)
+from recipes.versions import log_reset
+from users.models import Subscriber, User
+
+SEED_DOMAIN = 'seed.foodgram.local'
+SEED_PASSWORD = 'seed-password'
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+)
+BATCH_SIZE = 5000
+
+
+def zipf_weights(size, exponent=1.1):
+    """Накопленные веса: первые элементы выбираются гораздо чаще."""
+    return list(accumulate(
+        1 / (rank + 1) ** exponent for rank in range(size)
+    ))
+
+
+def sample_distinct(rng, population, weights, count):
+    """До count различных элементов с учетом весов."""
+    chosen = rng.choices(population, cum_weights=weights, k=count * 2)
+    return list(dict.fromkeys(chosen))[:count]
+
+
+def insert_rows(model, fields, rows):
+    """Вставка кортежей через executemany, минуя построение объектов.
+
+    Строки, нарушающие уникальность, пропускаются. Возвращает число
+    вставленных строк: sqlite3, psycopg2 и psycopg суммируют rowcount
+    по всем строкам executemany.
+    """
+    columns = ', '.join(
+        connection.ops.quote_name(model._meta.get_field(field).column)
+        for field in fields
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} '
+            f'({columns}) VALUES ({", ".join(["%s"] * len(fields))}) '
+            'ON CONFLICT DO NOTHING',
+            rows
+        )
+        return cursor.rowcount
+
+
+def ensure_recipes(total, stdout):
+    """Доводит каталог до total рецептов командой seed_scale."""
+    missing = total - Recipe.objects.count()
+    if missing > 0:
+        call_command(
+            'seed_scale', recipes=missing, users=max(1, missing // 10),
+            stdout=stdout
+        )
+
+
+class Command(BaseCommand):
+    """Синтетические данные в масштабе продакшена."""
+
+    help = (
+        'Создает пользователей, рецепты с ингредиентами и тегами, '
+        'избранное, корзины и подписки пакетными запросами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10_000)
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее число избранных рецептов у пользователя'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Среднее число рецептов в корзине пользователя'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--cleanup', action='store_true',
+            help='Удалить ранее созданные синтетические данные и выйти'
+        )
+
+    def cleanup(self):
+        users = User.objects.filter(email__endswith='@' + SEED_DOMAIN)
+        recipes = Recipe.objects.filter(author__in=users)
+        # Строки удаляются запросом на таблицу, без сбора каскада
+        # и сигналов по каждому объекту.
+        related = [
+            model.objects.filter(recipe__in=recipes) for model in (
+                Favorite, ShoppingCart, RecipeIngredient, Recipe.tags.through
+            )
+        ] + [
+            Favorite.objects.filter(user__in=users),
+            ShoppingCart.objects.filter(user__in=users),
+            Subscriber.objects.filter(user__in=users),
+            Subscriber.objects.filter(author__in=users),
+            Token.objects.filter(user__in=users),
+        ]
+        with transaction.atomic():
+            for rows in related:
+                rows._raw_delete(rows.db)
+            deleted = recipes._raw_delete(recipes.db)
+            users._raw_delete(users.db)
+        log_reset(LOG_NAME)
+        call_command('recount', stdout=self.stdout)
+        self.stdout.write(f'Удалено рецептов: {deleted}')
+
+    def create_users(self, rng, total):
+        start = User.objects.filter(
+            email__endswith='@' + SEED_DOMAIN
+        ).count()
+        password = make_password(SEED_PASSWORD)
+        users = User.objects.bulk_create([
+            User(
+                email=f'user{number}@{SEED_DOMAIN}',
+                username=f'seed-user-{number}', password=password,
+                first_name=rng.choice(('Анна', 'Иван', 'Ольга', 'Петр')),
+                last_name=rng.choice(('Иванова', 'Петров', 'Смирнова')),
+            )
+            for number in range(start, start + total)
+        ], batch_size=BATCH_SIZE)
+        return [user.pk for user in users]
+
+    def create_recipes(self, rng, total, authors, tags, ingredients):
+        words = [name for name, _ in ingredients]
+        author_w = zipf_weights(len(authors))
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                author_id=rng.choices(authors, cum_weights=author_w)[0],
+                name=' '.join(rng.sample(words, 2)).capitalize()[:256],
+                text=' '.join(rng.choices(words, k=30)),
+                cooking_time=max(1, int(rng.lognormvariate(3.4, 0.6))),
+            )
+            for _ in range(total)
+        ], batch_size=BATCH_SIZE)
+        ingredient_ids = [pk for _, pk in ingredients]
+        ingredient_w = zipf_weights(len(ingredient_ids))
+        tag_w = zipf_weights(len(tags))
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe in recipes:
+            for tag_id in sample_distinct(
+                rng, tags, tag_w, rng.choice((1, 1, 2, 3))
+            ):
+                recipe_tags.append((recipe.pk, tag_id))
+            count = min(len(ingredient_ids), max(
+                2, round(rng.gauss(8, 3))
+            ))
+            for ingredient_id in sample_distinct(
+                rng, ingredient_ids, ingredient_w, count
+            ):
+                recipe_ingredients.append((
+                    recipe.pk, ingredient_id,
+                    rng.choice((1, 2, 5, 50, 100, 200, 500))
+                ))
+        insert_rows(Recipe.tags.through, ('recipe', 'tag'), recipe_tags)
+        insert_rows(
+            RecipeIngredient, ('recipe', 'ingredient', 'amount'),
+            recipe_ingredients
+        )
+        return [recipe.pk for recipe in recipes]
+
+    def create_links(self, rng, model, field, users, targets, average):
+        """Связи пользователей с популярными рецептами или авторами."""
+        if not targets:
+            return 0
+        weights = zipf_weights(len(targets), exponent=0.8)
+        rows = []
+        for user_id in users:
+            count = min(len(targets), int(rng.expovariate(1 / average)))
+            for target in sample_distinct(rng, targets, weights, count):
+                if target != user_id or field != 'author':
+                    rows.append((user_id, target))
+        return insert_rows(model, ('user', field), rows)
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.cleanup()
+            return
+        started = perf_counter()
+        rng = random.Random(options['seed'])
+        if not Ingredient.objects.exists():
+            call_command('load_data', stdout=self.stdout)
+        for name, slug in DEFAULT_TAGS:
+            Tag.objects.get_or_create(slug=slug, defaults={'name': name})
+        tags = list(Tag.objects.values_list('id', flat=True))
+        ingredients = list(Ingredient.objects.values_list('name', 'id'))
+        rng.shuffle(ingredients)
+        with transaction.atomic():
+            users = self.create_users(rng, options['users'])
+            authors = rng.sample(users, len(users))
+            recipes = self.create_recipes(
+                rng, options['recipes'], authors, tags, ingredients
+            )
+            # Популярность рецептов не зависит от порядка создания.
+            rng.shuffle(recipes)
+            links = {
+                'избранное': self.create_links(
+                    rng, Favorite, 'recipe', users, recipes,
+                    options['favorites']
+                ),
+                'корзины': self.create_links(
+                    rng, ShoppingCart, 'recipe', users, recipes,
+                    options['carts']
+                ),
+                'подписки': self.create_links(
+                    rng, Subscriber, 'author', users, authors,
+                    options['subscriptions']
+                ),
+            }
+        log_reset(LOG_NAME)
+        call_command('recount', stdout=self.stdout)
+        self.stdout.write(
+            f'Пользователей: {options["users"]}, '
+            f'рецептов: {len(recipes)}, '
+            + ', '.join(f'{name}: {count}' for name, count in links.items())
+            + f' за {perf_counter() - started:.1f} с'
+        )
+        self.stdout.write(
+            f'Пароль синтетических пользователей: {SEED_PASSWORD}'
+        )
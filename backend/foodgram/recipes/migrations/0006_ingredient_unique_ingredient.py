@@ -0,0 +1,74 @@
+# Generated by Django 5.0.6 on 2026-10-17 06:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_shortlink_alter_recipe_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='favorite',
+            options={'default_related_name': 'favorite', 'verbose_name': 'Избранный рецепт', 'verbose_name_plural': 'избранные рецепты'},
+        ),
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'verbose_name': 'Ингредиент', 'verbose_name_plural': 'ингредиенты'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipeingredient',
+            options={'default_related_name': 'recipe_ingredients', 'verbose_name': 'Ингредиент', 'verbose_name_plural': 'ингредиенты'},
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(default=None, null=True, upload_to='recipes/', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(through='recipes.RecipeIngredient', to='recipes.ingredient', verbose_name='Ингредиенты'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredient', verbose_name='Ингредиент'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='lurl',
+            field=models.URLField(max_length=255, verbose_name='Оригинальная ссылка'),
+        ),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='surl',
+            field=models.CharField(max_length=132, unique=True, verbose_name='Короткая ссылка'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('recipe', 'user'), name='unique_recipe_in_favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('recipe', 'user'), name='unique_recipe_in_shopping_cart'),
+        ),
+    ]
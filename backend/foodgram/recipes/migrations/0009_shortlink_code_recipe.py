@@ -0,0 +1,62 @@
+# Generated by Django 5.0.6 on 2026-10-17 06:20
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+RECIPE_URL = re.compile(r'/recipes/(\d+)/?$')
+
+
+def move_links_to_codes(apps, schema_editor):
+    """Сохраняет старые коды, привязывая их к рецептам по lurl."""
+    ShortLink = apps.get_model('recipes', 'ShortLink')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recipe_ids = set(Recipe.objects.values_list('id', flat=True))
+    for link in ShortLink.objects.all():
+        match = RECIPE_URL.search(link.lurl)
+        if match and int(match.group(1)) in recipe_ids:
+            link.recipe_id = int(match.group(1))
+            link.code = link.surl.rstrip('/').rsplit('/', 1)[-1]
+            link.save(update_fields=('recipe', 'code'))
+        else:
+            link.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shortlink',
+            name='recipe',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='short_links', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddField(
+            model_name='shortlink',
+            name='code',
+            field=models.CharField(max_length=16, null=True, verbose_name='Код ссылки'),
+        ),
+        migrations.RunPython(move_links_to_codes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='shortlink',
+            name='lurl',
+        ),
+        migrations.RemoveField(
+            model_name='shortlink',
+            name='surl',
+        ),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='short_links', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='code',
+            field=models.CharField(max_length=16, unique=True, verbose_name='Код ссылки'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-17 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_access_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('version', models.CharField(max_length=32)),
+            ],
+            options={
+                'verbose_name': 'Версия данных',
+                'verbose_name_plural': 'версии данных',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-17 08:25
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+                ('object_id', models.PositiveBigIntegerField(null=True)),
+                ('created', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение данных',
+                'verbose_name_plural': 'изменения данных',
+                'indexes': [models.Index(fields=['name', 'id'], name='datachange_name_id')],
+            },
+        ),
+    ]
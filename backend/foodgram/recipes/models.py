@@ -1,8 +1,12 @@
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Now
 from django.urls import reverse
+from django.utils import timezone
 
-from users.models import User
+from foodgram.model_mixins import CountersModelMixin, TrackedFieldsMixin
+from users.models import Subscriber, User
 
 
 class Tag(models.Model):
@@ -36,12 +40,50 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """Запросы рецептов для чтения."""
+
+    def with_related(self):
+        """Автор рецепта; теги и состав загружает api.fast_serializers."""
+        return self.select_related('author')
+
+    def with_user_flags(self, user):
+        """Аннотирует флаги избранного, корзины и подписки на автора."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                author_is_subscribed=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            author_is_subscribed=Exists(Subscriber.objects.filter(
+                user=user, author=OuterRef('author')
+            )),
+        )
+
+    def touch(self):
+        """Отмечает рецепты измененными для условных запросов."""
+        return self.update(updated_at=timezone.now())
+
+
+class Recipe(TrackedFieldsMixin, CountersModelMixin, models.Model):
     """Класс рецептов."""
 
     name = models.CharField(verbose_name='Название', max_length=256)
@@ -60,12 +102,29 @@ class Recipe(models.Model):
     cooking_time = models.IntegerField(
         verbose_name='Время приготовления', validators=(MinValueValidator(1),)
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах', default=0, editable=False
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения', auto_now=True, db_index=True
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = ('favorites_count', 'in_carts_count')
+    tracked_fields = ('image',)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'рецепты'
         default_related_name = 'recipes'
         ordering = ['-id']
+        indexes = [
+            models.Index(fields=['author', '-id'], name='recipe_author_id'),
+        ]
 
     def __str__(self):
         return self.name
@@ -122,6 +181,9 @@ class ShoppingCart(models.Model):
                 name='unique_recipe_in_shopping_cart'
             )
         ]
+        indexes = [
+            models.Index(fields=['user', 'recipe'], name='cart_user_recipe'),
+        ]
 
     def __str__(self):
         return f'{self.recipe}'
@@ -147,6 +209,11 @@ class Favorite(models.Model):
                 name='unique_recipe_in_favorite'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'], name='favorite_user_recipe'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.recipe}'
@@ -155,11 +222,68 @@ class Favorite(models.Model):
 class ShortLink(models.Model):
     """Модель короткой ссылки."""
 
-    lurl = models.URLField(max_length=255, verbose_name='Оригинальная ссылка',)
-    surl = models.CharField(
-        max_length=132, verbose_name='Короткая ссылка', unique=True
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, verbose_name='Рецепт',
+        related_name='short_links'
+    )
+    code = models.CharField(
+        max_length=16, verbose_name='Код ссылки', unique=True
     )
 
     class Meta:
         verbose_name = 'Короткая ссылка'
         verbose_name_plural = 'короткие ссылки'
+
+    def __str__(self):
+        return self.code
+
+
+class DataVersion(models.Model):
+    """Версия набора данных для инвалидации кэшей во всех процессах."""
+
+    name = models.CharField(max_length=64, primary_key=True)
+    version = models.CharField(max_length=32)
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'версии данных'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class DataChange(models.Model):
+    """Журнал изменений объектов для обновления кэшей во всех процессах.
+
+    object_id = NULL означает, что изменился весь набор данных.
+    """
+
+    name = models.CharField(max_length=64)
+    object_id = models.PositiveBigIntegerField(null=True)
+    created = models.DateTimeField(db_default=Now(), db_index=True)
+
+    class Meta:
+        verbose_name = 'Изменение данных'
+        verbose_name_plural = 'изменения данных'
+        indexes = [
+            models.Index(fields=('name', 'id'), name='datachange_name_id'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}: {self.object_id}'
+
+
+class RecipeSearchIndex(models.Model):
+    """Таблица FTS5 из миграции 0010_recipe_search, только для SQLite.
+
+    Нужна, чтобы поиск соединял рецепты с индексом через ORM.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', related_name='search_index'
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'recipes_recipe_fts'
@@ -0,0 +1,120 @@
+"""Уменьшенные копии изображений рецептов и аватаров."""
+from collections import OrderedDict
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import features, Image
+
+RENDITIONS = {
+    'card': (400, 400),
+    'detail': (1200, 1200),
+    'avatar': (160, 160),
+}
+FORMAT, EXTENSION = (
+    ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+)
+
+
+class RenditionRegistry:
+    """LRU-множество копий, которые уже есть в хранилище.
+
+    Копия не меняется, пока существует оригинал с тем же именем, поэтому
+    найденные копии запоминаются, и хранилище проверяется только для
+    еще не созданных.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = Lock()
+        self._names = OrderedDict()
+
+    def exists(self, storage, name):
+        with self._lock:
+            if name in self._names:
+                self._names.move_to_end(name)
+                return True
+        if not storage.exists(name):
+            return False
+        self.add(name)
+        return True
+
+    def add(self, name):
+        with self._lock:
+            self._names[name] = None
+            self._names.move_to_end(name)
+            if len(self._names) > self.size:
+                self._names.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._names.clear()
+
+
+registry = RenditionRegistry(settings.RENDITION_CACHE_SIZE)
+
+
+def rendition_name(name, size):
+    """Путь копии рядом с оригиналом: x.png -> x.png.card.webp.
+
+    Расширение оригинала остается в имени, поэтому у x.png и x.jpeg
+    разные копии.
+    """
+    return f'{name}.{size}.{EXTENSION}'
+
+
+def rendition_url(field_file, size):
+    """URL копии или оригинала, пока копия не готова."""
+    return stored_rendition_url(field_file.storage, field_file.name, size)
+
+
+def stored_rendition_url(storage, name, size):
+    """rendition_url по имени файла в хранилище."""
+    rendition = rendition_name(name, size)
+    return storage.url(
+        rendition if registry.exists(storage, rendition) else name
+    )
+
+
+def missing_sizes(field_file, sizes):
+    return [
+        size for size in sizes
+        if not registry.exists(
+            field_file.storage, rendition_name(field_file.name, size)
+        )
+    ]
+
+
+def generate(storage, name, sizes):
+    """Создает копии указанных размеров для файла name."""
+    with storage.open(name, 'rb') as file:
+        original = Image.open(file)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if FORMAT == 'WEBP' else 'RGB')
+    if FORMAT == 'JPEG':
+        original = original.convert('RGB')
+    for size in sizes:
+        image = original.copy()
+        image.thumbnail(RENDITIONS[size], Image.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, FORMAT, quality=settings.RENDITION_QUALITY)
+        target = rendition_name(name, size)
+        storage.delete(target)
+        saved = storage.save(target, ContentFile(buffer.getvalue()))
+        if saved != target:
+            # Копию уже записал параллельный обработчик.
+            storage.delete(saved)
+        registry.add(target)
+
+
+def schedule(field_file, sizes):
+    """Ставит создание недостающих копий в очередь фоновых задач."""
+    from .tasks import make_renditions
+
+    if not field_file:
+        return
+    sizes = missing_sizes(field_file, sizes)
+    if sizes:
+        make_renditions.enqueue(field_file.name, sizes)
@@ -0,0 +1,71 @@
+"""Полнотекстовый поиск рецептов.
+
+Столбец search_vector (PostgreSQL) и таблица recipes_recipe_fts (SQLite)
+создаются миграцией 0010_recipe_search. Столбца нет в модели, а таблица
+описана неуправляемой моделью RecipeSearchIndex, поэтому условия и ранг
+задаются через RawSQL.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe, RecipeSearchIndex
+
+TABLE = Recipe._meta.db_table
+FTS = RecipeSearchIndex._meta.db_table
+TSQUERY = "to_tsquery('russian', %s)"
+
+
+def search_terms(query):
+    """Слова запроса от двух букв, без знаков операторов поиска."""
+    return [term for term in re.findall(r'\w+', query) if len(term) > 1]
+
+
+def fts5_query(query):
+    """Запрос FTS5: все слова обязательны, каждое как префикс."""
+    return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+
+def tsquery(query):
+    """Запрос to_tsquery с тем же смыслом, что и fts5_query."""
+    return ' & '.join(f'{term}:*' for term in search_terms(query))
+
+
+def search_postgresql(queryset, query):
+    match = tsquery(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(RawSQL(
+        f'"{TABLE}"."search_vector" @@ {TSQUERY}', (match,),
+        output_field=BooleanField()
+    )).annotate(search_rank=RawSQL(
+        f'ts_rank("{TABLE}"."search_vector", {TSQUERY})', (match,),
+        output_field=FloatField()
+    )).order_by('-search_rank', '-id')
+
+
+def search_sqlite(queryset, query):
+    match = fts5_query(query)
+    if not match:
+        return queryset.none()
+    # Соединение с FTS5 через RecipeSearchIndex вместо коррелированного
+    # подзапроса: MATCH выполняется один раз. bm25 меньше для лучших
+    # совпадений, веса столбцов: name 10, text 1.
+    return queryset.filter(
+        RawSQL(f'"{FTS}" MATCH %s', (match,), output_field=BooleanField()),
+        search_index__isnull=False,
+    ).annotate(search_rank=RawSQL(
+        f'-bm25("{FTS}", 10.0, 1.0)', (), output_field=FloatField()
+    )).order_by('-search_rank', '-id')
+
+
+def search_recipes(queryset, query):
+    """Фильтрует рецепты по запросу и сортирует по релевантности."""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return search_postgresql(queryset, query)
+    if vendor == 'sqlite':
+        return search_sqlite(queryset, query)
+    return queryset.filter(Q(name__icontains=query) | Q(text__icontains=query))
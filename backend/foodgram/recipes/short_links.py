@@ -0,0 +1,80 @@
+"""Детерминированные коды коротких ссылок и их разрешение."""
+from collections import OrderedDict
+from string import ascii_letters, digits
+from threading import Lock
+
+from django.conf import settings
+
+from .models import ShortLink
+
+ALPHABET = digits + ascii_letters
+CODE_LENGTH = 6
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH
+# Множитель взаимно прост с 62, поэтому отображение id -> код обратимо
+# и последовательные рецепты получают непохожие коды.
+MULTIPLIER = 35_742_549_199
+
+
+def encode(recipe_id):
+    """Код из 6 символов base62 для рецепта.
+
+    Старые случайные коды состояли из 7 букв, поэтому новые с ними
+    не пересекаются.
+    """
+    value = (recipe_id * MULTIPLIER + settings.SHORT_LINK_SALT) % CODE_SPACE
+    code = []
+    for _ in range(CODE_LENGTH):
+        value, index = divmod(value, len(ALPHABET))
+        code.append(ALPHABET[index])
+    return ''.join(reversed(code))
+
+
+class ResolveCache:
+    """LRU-кэш кодов, общий для синхронного и асинхронного разрешения."""
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = Lock()
+        self._codes = OrderedDict()
+
+    def get(self, code):
+        with self._lock:
+            recipe_id = self._codes.get(code)
+            if recipe_id is not None:
+                self._codes.move_to_end(code)
+            return recipe_id
+
+    def set(self, code, recipe_id):
+        with self._lock:
+            self._codes[code] = recipe_id
+            if len(self._codes) > self.size:
+                self._codes.popitem(last=False)
+        return recipe_id
+
+    def clear(self):
+        with self._lock:
+            self._codes.clear()
+
+
+resolve_cache = ResolveCache(settings.SHORT_LINK_CACHE_SIZE)
+
+
+def recipe_ids(code):
+    return ShortLink.objects.values_list('recipe_id', flat=True).filter(
+        code=code
+    )
+
+
+def resolve(code):
+    """id рецепта по коду; промахи бросают исключение и не кэшируются."""
+    recipe_id = resolve_cache.get(code)
+    if recipe_id is None:
+        recipe_id = resolve_cache.set(code, recipe_ids(code).get())
+    return recipe_id
+
+
+async def aresolve(code):
+    recipe_id = resolve_cache.get(code)
+    if recipe_id is None:
+        recipe_id = resolve_cache.set(code, await recipe_ids(code).aget())
+    return recipe_id
@@ -0,0 +1,134 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from .counters import change_counter
+from .coverage_index import coverage_index
+from . import renditions, short_links
+from .models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, ShortLink,
+    Tag
+)
+from .versions import bump_version
+from users.models import User
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    bump_version('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    bump_version('tags')
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(ingredients=instance).touch()
+
+
+@receiver(post_save, sender=Tag)
+def touch_tag_recipes(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(tags=instance).touch()
+
+
+@receiver(pre_delete, sender=Tag)
+def touch_deleted_tag_recipes(sender, instance, **kwargs):
+    # Связи с тегом удаляются каскадом без сигнала m2m_changed.
+    Recipe.objects.filter(tags=instance).touch()
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, **kwargs):
+    # Пароль, last_login и счетчики в рецептах не выводятся.
+    if not created and instance.changed_fields():
+        Recipe.objects.filter(author=instance).touch()
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def touch_recipe_ingredients(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).touch()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        Recipe.objects.filter(pk=instance.pk).touch()
+    elif pk_set:
+        Recipe.objects.filter(pk__in=pk_set).touch()
+    else:
+        Recipe.objects.filter(tags=instance).touch()
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'recipes_count', -1
+    )
+
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created and instance.recipe_id:
+        change_counter(
+            Recipe.objects.filter(pk=instance.recipe_id),
+            RECIPE_COUNTERS[sender], 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    if instance.recipe_id:
+        change_counter(
+            Recipe.objects.filter(pk=instance.recipe_id),
+            RECIPE_COUNTERS[sender], -1
+        )
+
+
+@receiver(post_delete, sender=ShortLink)
+def reset_short_links_cache(sender, **kwargs):
+    short_links.resolve_cache.clear()
+
+
+@receiver(post_save, sender=Recipe)
+def make_recipe_renditions(sender, instance, **kwargs):
+    if 'image' in instance.changed_fields():
+        renditions.schedule(instance.image, ('card', 'detail'))
+
+
+@receiver(post_save, sender=User)
+def make_avatar_renditions(sender, instance, **kwargs):
+    if 'avatar' in instance.changed_fields():
+        renditions.schedule(instance.avatar, ('avatar',))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def update_recipe_coverage(sender, instance, **kwargs):
+    coverage_index.schedule(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def update_ingredient_coverage(sender, instance, **kwargs):
+    coverage_index.schedule(instance.recipe_id)
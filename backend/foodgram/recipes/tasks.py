@@ -0,0 +1,14 @@
+from django.core.files.storage import default_storage
+from django.db.models import Q
+
+from . import renditions
+from .models import Recipe
+from jobs.queue import task
+
+
+@task
+def make_renditions(name, sizes):
+    renditions.generate(default_storage, name, sizes)
+    # Ответы ссылались на оригинал: новые ETag и фрагменты рецептов
+    # получат ссылки на копии.
+    Recipe.objects.filter(Q(image=name) | Q(author__avatar=name)).touch()
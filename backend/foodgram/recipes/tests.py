@@ -0,0 +1,558 @@
+import json
+from io import BytesIO, StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Exists, OuterRef
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from jobs.models import Job
+from recipes import renditions, short_links
+from recipes.counters import recount
+from recipes.coverage_index import CoverageIndex, LOG_NAME
+from recipes.management.commands.explain_queries import (
+    Command as ExplainCommand
+)
+from recipes.management.commands.load_data import (
+    CHUNK_SIZE, DEFAULT_PATH, iter_json_array
+)
+from recipes.management.commands.seed_scale import insert_rows
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, ShortLink,
+    Tag
+)
+from recipes.search import fts5_query, tsquery
+from recipes.versions import log_reset
+from users.models import User
+
+
+class QueryPlansTest(TestCase):
+    """Основные эндпоинты не читают большие таблицы полным перебором."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_scale', users=100, recipes=2000, stdout=StringIO()
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def test_no_full_scans(self):
+        # explain_queries завершается с CommandError, если в плане
+        # запроса есть полный перебор таблицы от min_rows строк.
+        call_command('explain_queries', min_rows=1000, stdout=StringIO())
+
+    def test_full_scan_detected(self):
+        sql, params = Recipe.objects.filter(
+            text__contains='суп'
+        ).order_by('name').query.sql_with_params()
+        _, scans = ExplainCommand().explain(sql, params)
+        self.assertIn(Recipe._meta.db_table, scans)
+
+    def test_subquery_limit_not_outer_limit(self):
+        # LIMIT 1 подзапроса Exists() не делает перебор внешнего
+        # запроса чтением первых строк.
+        recipes = Recipe.objects.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(recipe=OuterRef('pk'))
+            )
+        ).filter(text__contains='суп').order_by('-id')
+        for queryset, scanned in ((recipes, True), (recipes[:10], False)):
+            with self.subTest(scanned=scanned):
+                sql, params = queryset.query.sql_with_params()
+                _, scans = ExplainCommand().explain(sql, params)
+                self.assertEqual(Recipe._meta.db_table in scans, scanned)
+
+
+class InsertRowsTest(TestCase):
+    """insert_rows считает только вставленные строки."""
+
+    def test_duplicates_not_counted(self):
+        tags = [
+            (f'Тег {i}', f'tag{i}') for i in range(3)
+        ]
+        self.assertEqual(insert_rows(Tag, ('name', 'slug'), tags), 3)
+        self.assertEqual(
+            insert_rows(Tag, ('name', 'slug'), tags + [('Новый', 'new')]), 1
+        )
+        self.assertEqual(Tag.objects.count(), 4)
+
+
+class RecipeSearchTest(TestCase):
+    """Полнотекстовый поиск: релевантность и сочетание с фильтрами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='cook@example.com', username='cook', password='pass',
+            first_name='Повар', last_name='Тестовый'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.com', username='other', password='pass',
+            first_name='Другой', last_name='Повар'
+        )
+        cls.soup = Tag.objects.create(name='Супы', slug='soup')
+        cls.dinner = Tag.objects.create(name='Ужин', slug='dinner')
+        recipes = (
+            ('Борщ украинский', 'Свекла, капуста и мясо.', cls.author,
+             cls.soup),
+            ('Щи', 'Капуста и мясо, почти как борщ.', cls.author,
+             cls.soup),
+            ('Борщ зеленый', 'Щавель и яйцо.', cls.other, cls.dinner),
+            ('Котлеты', 'Мясной фарш и лук.', cls.author, cls.dinner),
+        )
+        cls.recipes = {}
+        for name, text, author, tag in recipes:
+            recipe = Recipe.objects.create(
+                name=name, text=text, author=author, cooking_time=30
+            )
+            recipe.tags.set([tag])
+            cls.recipes[name] = recipe
+
+    def search(self, **params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()['results']]
+
+    def test_name_ranked_above_text(self):
+        names = self.search(search='борщ')
+        self.assertEqual(set(names), {'Борщ украинский', 'Щи', 'Борщ зеленый'})
+        self.assertEqual(names[-1], 'Щи')
+
+    def test_prefix_and_all_words(self):
+        self.assertEqual(self.search(search='котл'), ['Котлеты'])
+        self.assertEqual(
+            self.search(search='борщ щавель'), ['Борщ зеленый']
+        )
+        self.assertEqual(self.search(search='пельмени'), [])
+
+    def test_backend_queries_match(self):
+        # PostgreSQL и SQLite получают одни и те же слова как префиксы.
+        query = 'борщ & "щавель" | котл* ! а'
+        self.assertEqual(fts5_query(query), '"борщ"* "щавель"* "котл"*')
+        self.assertEqual(tsquery(query), 'борщ:* & щавель:* & котл:*')
+        self.assertEqual(tsquery('!'), '')
+
+    def test_blank_search_ignored(self):
+        self.assertEqual(len(self.search(search='  ')), len(self.recipes))
+
+    def test_search_with_filters(self):
+        self.assertEqual(
+            set(self.search(search='борщ', tags='soup')),
+            {'Борщ украинский', 'Щи'}
+        )
+        self.assertEqual(
+            self.search(search='борщ', author=self.other.pk),
+            ['Борщ зеленый']
+        )
+
+    def test_cursor_keeps_ranking(self):
+        self.assertEqual(
+            self.search(search='борщ', cursor=''), self.search(search='борщ')
+        )
+
+
+class LoadDataTest(TestCase):
+    """Загрузка ингредиентов и ошибки во входных файлах."""
+
+    def load(self, name, content):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / name
+        path.write_text(content, encoding='UTF-8')
+        call_command('load_data', '--file', str(path), stdout=StringIO())
+        return path
+
+    def test_json_read_in_chunks(self):
+        with open(DEFAULT_PATH.with_suffix('.json'), encoding='UTF-8') as file:
+            expected = json.load(file)
+        for chunk_size in (1, 7, CHUNK_SIZE):
+            with self.subTest(chunk_size=chunk_size), open(
+                DEFAULT_PATH.with_suffix('.json'), encoding='UTF-8'
+            ) as file:
+                self.assertEqual(
+                    [item for _, item in iter_json_array(file, chunk_size)],
+                    expected
+                )
+
+    def test_loads_csv_and_json(self):
+        self.load('a.csv', 'соль,г\n\nперец, щепотка\nсоль,г\n')
+        self.load('b.json', '[{"name": "сахар", "measurement_unit": "г"}]')
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', 'measurement_unit')),
+            {('соль', 'г'), ('перец', 'щепотка'), ('сахар', 'г')}
+        )
+
+    def test_errors_name_file_and_row(self):
+        cases = (
+            ('a.csv', 'соль,г\nперец\n', 'строка 2'),
+            ('b.json', '[{"name": "соль", "measurement_unit": "г"}, {}]',
+             'элемент 2'),
+            ('c.json', '[{"name": "соль", "measurement_unit": "г"} oops]',
+             'элемент 1'),
+            ('d.json', '{}', 'начало файла'),
+        )
+        for name, content, where in cases:
+            with self.subTest(name=name):
+                with self.assertRaisesMessage(CommandError, where) as error:
+                    self.load(name, content)
+                self.assertIn(name, str(error.exception))
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_missing_file(self):
+        with self.assertRaisesMessage(CommandError, 'missing.csv'):
+            call_command('load_data', '--file', 'missing.csv')
+
+
+def image_file(name):
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+class RenditionsTest(TestCase):
+    """Имена копий, постановка задач и учет готовых копий."""
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media = directory.name
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        renditions.registry.clear()
+        self.user = User.objects.create_user(
+            email='cook@example.com', username='cook', password='pass',
+            first_name='Повар', last_name='Тестовый'
+        )
+
+    def test_name_keeps_extension(self):
+        self.assertEqual(
+            renditions.rendition_name('recipes/temp.png', 'card'),
+            f'recipes/temp.png.card.{renditions.EXTENSION}'
+        )
+        self.assertNotEqual(
+            renditions.rendition_name('recipes/temp.png', 'card'),
+            renditions.rendition_name('recipes/temp.jpeg', 'card')
+        )
+
+    def save(self, instance, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save(**kwargs)
+        return list(Job.objects.values_list('payload', flat=True))
+
+    def test_scheduled_only_when_image_changes(self):
+        recipe = Recipe(
+            name='Суп', text='Текст', author=self.user, cooking_time=5,
+            image=image_file('temp.png')
+        )
+        jobs = self.save(recipe)
+        self.assertEqual(
+            jobs, [{'args': [recipe.image.name, ['card', 'detail']],
+                    'kwargs': {}}]
+        )
+        recipe.name = 'Борщ'
+        self.assertEqual(len(self.save(recipe)), 1)
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        recipe.text = 'Новый текст'
+        self.assertEqual(len(self.save(recipe)), 1)
+        recipe.image = image_file('temp.jpeg')
+        self.assertEqual(len(self.save(recipe)), 2)
+
+    def test_scheduled_only_when_avatar_changes(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Шеф'
+        self.assertEqual(self.save(user), [])
+        user.avatar = image_file('me.png')
+        self.assertEqual(len(self.save(user)), 1)
+        self.assertEqual(len(self.save(user, update_fields=['avatar'])), 1)
+
+    def test_existing_renditions_recorded(self):
+        storage = FileSystemStorage(self.media)
+        name = storage.save('recipes/temp.png', image_file('temp.png'))
+        with mock.patch.object(
+            storage, 'exists', wraps=storage.exists
+        ) as exists:
+            for _ in range(2):
+                self.assertEqual(
+                    renditions.stored_rendition_url(storage, name, 'card'),
+                    storage.url(name)
+                )
+            self.assertEqual(exists.call_count, 2)
+            renditions.generate(storage, name, ['card'])
+            exists.reset_mock()
+            for _ in range(2):
+                self.assertEqual(
+                    renditions.stored_rendition_url(storage, name, 'card'),
+                    storage.url(renditions.rendition_name(name, 'card'))
+                )
+            self.assertEqual(exists.call_count, 0)
+
+
+class CoverageIndexTest(TestCase):
+    """Индексы разных процессов обновляются по журналу изменений."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='cook@example.com', username='cook', password='pass',
+            first_name='Повар', last_name='Тестовый'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Продукт {i}', measurement_unit='г'
+            )
+            for i in range(4)
+        ]
+
+    def create_recipe(self, *ingredients):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                name='Рецепт', text='Текст', author=self.author,
+                cooking_time=5
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=1)
+                for ingredient in ingredients
+            )
+            recipe.save()
+        return recipe
+
+    def rank(self, index, *ingredients, **kwargs):
+        return list(index.rank(
+            [ingredient.pk for ingredient in ingredients], **kwargs
+        ))
+
+    def test_other_process_patches_without_rebuild(self):
+        first, second, third, fourth = self.ingredients
+        soup = self.create_recipe(first, second)
+        other = CoverageIndex()
+        self.assertEqual(self.rank(other, first), [(soup.pk, 1, 1)])
+        stew = self.create_recipe(first, second, third)
+        with mock.patch.object(other, '_build') as build:
+            self.assertEqual(
+                self.rank(other, first, second),
+                [(soup.pk, 2, 0), (stew.pk, 2, 1)]
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                RecipeIngredient.objects.filter(
+                    recipe=soup, ingredient=second
+                ).delete()
+            self.assertEqual(
+                self.rank(other, second), [(stew.pk, 1, 2)]
+            )
+        build.assert_not_called()
+        log_reset(LOG_NAME)
+        with mock.patch.object(
+            other, '_build', wraps=other._build
+        ) as build:
+            self.assertEqual(self.rank(other, fourth), [])
+        build.assert_called_once()
+
+    def test_page_from_ranking(self):
+        first, second, third, _ = self.ingredients
+        recipes = [
+            self.create_recipe(first),
+            self.create_recipe(first, second),
+            self.create_recipe(first, second, third),
+            self.create_recipe(first, third),
+        ]
+        ranking = CoverageIndex().rank([first.pk, second.pk])
+        expected = list(ranking)
+        self.assertEqual(len(ranking), len(recipes))
+        self.assertEqual(ranking[0:2], expected[0:2])
+        self.assertEqual(ranking[2:4], expected[2:4])
+        self.assertEqual(
+            [row[0] for row in expected],
+            [recipes[1].pk, recipes[0].pk, recipes[2].pk, recipes[3].pk]
+        )
+
+
+class CountersTest(TestCase):
+    """Денормализованные счетчики рецептов и авторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='cook@example.com', username='cook', password='pass',
+            first_name='Повар', last_name='Тестовый'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@example.com', username='reader', password='pass',
+            first_name='Читатель', last_name='Тестовый'
+        )
+
+    def create_recipe(self):
+        return Recipe.objects.create(
+            name='Суп', text='Текст', author=self.author, cooking_time=5
+        )
+
+    def counters(self, recipe):
+        recipe.refresh_from_db()
+        return recipe.favorites_count, recipe.in_carts_count
+
+    def test_signals(self):
+        recipe = self.create_recipe()
+        other = self.create_recipe()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 2)
+        favorite = Favorite.objects.create(user=self.reader, recipe=recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=recipe)
+        ShoppingCart.objects.create(user=self.author, recipe=recipe)
+        self.assertEqual(self.counters(recipe), (1, 2))
+        favorite.delete()
+        ShoppingCart.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.counters(recipe), (0, 1))
+        # Счетчик не опускается ниже нуля, даже если он уже разошелся.
+        Favorite.objects.create(user=self.reader, recipe=other)
+        Recipe.objects.filter(pk=other.pk).update(favorites_count=0)
+        Favorite.objects.filter(recipe=other).delete()
+        self.assertEqual(self.counters(other), (0, 0))
+        other.delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+
+    def test_recount(self):
+        recipe = self.create_recipe()
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            favorites_count=5, in_carts_count=3
+        )
+        self.assertEqual(
+            recount(Recipe, 'favorites_count', Favorite, 'recipe'), 1
+        )
+        self.assertEqual(
+            recount(Recipe, 'favorites_count', Favorite, 'recipe'), 0
+        )
+        User.objects.filter(pk=self.author.pk).update(recipes_count=0)
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.counters(recipe), (1, 0))
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+
+    def test_full_save_keeps_counters(self):
+        recipe = self.create_recipe()
+        stale = Recipe.objects.get(pk=recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        self.create_recipe()
+        stale.name = 'Борщ'
+        stale.save()
+        author.first_name = 'Шеф'
+        author.save()
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.name, recipe.favorites_count), ('Борщ', 1))
+        author.refresh_from_db()
+        self.assertEqual((author.first_name, author.recipes_count), ('Шеф', 2))
+        # Явно указанный в update_fields счетчик записывается.
+        stale.favorites_count = 7
+        stale.save(update_fields=['favorites_count'])
+        self.assertEqual(self.counters(recipe), (7, 0))
+
+
+class ShortLinksTest(TestCase):
+    """Коды коротких ссылок из id рецепта и их разрешение."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            name='Борщ', text='Описание', cooking_time=60, author=author
+        )
+
+    def setUp(self):
+        short_links.resolve_cache.clear()
+
+    def test_codes_unique(self):
+        codes = {short_links.encode(pk) for pk in range(1, 100_001)}
+        self.assertEqual(len(codes), 100_000)
+        self.assertTrue(all(
+            len(code) == short_links.CODE_LENGTH
+            and set(code) <= set(short_links.ALPHABET)
+            for code in codes
+        ))
+
+    def test_get_link_idempotent(self):
+        path = f'/api/recipes/{self.recipe.pk}/get-link/'
+        first = self.client.get(path).json()
+        self.assertEqual(self.client.get(path).json(), first)
+        self.assertEqual(
+            list(ShortLink.objects.values_list('recipe_id', 'code')),
+            [(self.recipe.pk, short_links.encode(self.recipe.pk))]
+        )
+
+    def test_redirect_cached(self):
+        code = short_links.encode(self.recipe.pk)
+        ShortLink.objects.create(recipe=self.recipe, code=code)
+        response = self.client.get(f'/s/{code}/')
+        self.assertRedirects(
+            response, f'/recipes/{self.recipe.pk}',
+            fetch_redirect_response=False
+        )
+        with self.assertNumQueries(0):
+            self.client.get(f'/s/{code}/')
+
+    def test_unknown_code_not_cached(self):
+        code = short_links.encode(self.recipe.pk)
+        self.assertEqual(self.client.get(f'/s/{code}/').status_code, 404)
+        ShortLink.objects.create(recipe=self.recipe, code=code)
+        self.assertEqual(self.client.get(f'/s/{code}/').status_code, 302)
+
+
+class ShortLinkMigrationTest(TransactionTestCase):
+    """Миграция 0009 сохраняет старые случайные коды."""
+
+    before = [('recipes', '0008_recipe_updated_at')]
+    after = [('recipes', '0009_shortlink_code_recipe')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_legacy_codes_kept(self):
+        apps = self.migrate(self.before)
+        author = apps.get_model('users', 'User').objects.create(
+            email='author@example.com', username='author'
+        )
+        recipe = apps.get_model('recipes', 'Recipe').objects.create(
+            name='Борщ', text='Описание', cooking_time=60, author=author
+        )
+        ShortLink = apps.get_model('recipes', 'ShortLink')
+        ShortLink.objects.create(
+            lurl=f'http://testserver/recipes/{recipe.pk}/',
+            surl='http://testserver/s/AbCdEfG/'
+        )
+        ShortLink.objects.create(
+            lurl='http://testserver/recipes/999/',
+            surl='http://testserver/s/Missing/'
+        )
+        apps = self.migrate(self.after)
+        self.assertEqual(
+            list(apps.get_model('recipes', 'ShortLink').objects.values_list(
+                'recipe_id', 'code'
+            )),
+            [(recipe.pk, 'AbCdEfG')]
+        )
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        short_links.resolve_cache.clear()
+        self.assertRedirects(
+            self.client.get('/s/AbCdEfG/'), f'/recipes/{recipe.pk}',
+            fetch_redirect_response=False
+        )
@@ -0,0 +1,87 @@
+"""Версии и журнал изменений для инвалидации кэшей в памяти процессов.
+
+Версия хранится в таблице DataVersion, поэтому смена версии в одном
+процессе (сигнал, команда загрузки, воркер задач) видна всем остальным
+при следующем чтении. Журнал DataChange перечисляет измененные объекты,
+чтобы процессы обновляли кэш по частям, а не перестраивали целиком.
+"""
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.db.models.functions import Now
+
+from .models import DataChange, DataVersion
+
+# Запись с меньшим id может зафиксироваться позже записи с большим,
+# поэтому записи моложе COMMIT_LAG перечитываются.
+COMMIT_LAG = timedelta(seconds=10)
+
+
+def versions(name):
+    return DataVersion.objects.filter(name=name).values_list(
+        'version', flat=True
+    )
+
+
+def get_version(name):
+    """Текущая версия; пустая строка, пока версия не менялась."""
+    return versions(name).first() or ''
+
+
+async def aget_version(name):
+    return await versions(name).afirst() or ''
+
+
+def bump_version(name):
+    # Случайное значение не совпадет ни с одной прежней версией.
+    version = uuid4().hex
+    DataVersion.objects.update_or_create(
+        name=name, defaults={'version': version}
+    )
+    return version
+
+
+def replace_version(name, expected):
+    """Новая версия, если текущая равна expected, иначе None.
+
+    Проверка и замена выполняются одним UPDATE, поэтому процесс не
+    примет за актуальные данные, измененные другим процессом.
+    """
+    version = uuid4().hex
+    if DataVersion.objects.filter(name=name, version=expected).update(
+        version=version
+    ):
+        return version
+    return None
+
+
+def log_changes(name, object_ids):
+    """Записывает изменения объектов и удаляет устаревшие записи журнала."""
+    DataChange.objects.filter(
+        name=name,
+        created__lt=Now() - timedelta(seconds=settings.DATA_CHANGES_RETENTION)
+    ).delete()
+    DataChange.objects.bulk_create(
+        DataChange(name=name, object_id=object_id)
+        for object_id in object_ids
+    )
+
+
+def log_reset(name):
+    """Отмечает в журнале, что изменился весь набор данных."""
+    DataChange.objects.create(name=name, object_id=None)
+
+
+def last_change_id(name):
+    return DataChange.objects.filter(name=name).aggregate(
+        last=Max('id')
+    )['last'] or 0
+
+
+def recent_changes(name, after_id):
+    """(id, object_id) записей с id больше after_id или моложе COMMIT_LAG."""
+    return list(DataChange.objects.filter(
+        Q(id__gt=after_id) | Q(created__gte=Now() - COMMIT_LAG), name=name
+    ).values_list('id', 'object_id'))
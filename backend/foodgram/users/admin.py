@@ -19,8 +19,9 @@ def upper_case_name(obj):
 
 
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('username', upper_case_name, 'email',)
+    list_display = ('username', upper_case_name, 'email', 'recipes_count')
     search_fields = ('first_name', 'email')
+    readonly_fields = ('recipes_count',)
     actions = [delete]
 
 
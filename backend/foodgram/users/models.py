@@ -1,8 +1,10 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from foodgram.model_mixins import CountersModelMixin, TrackedFieldsMixin
 
-class User(AbstractUser):
+
+class User(TrackedFieldsMixin, CountersModelMixin, AbstractUser):
     """Класс пользователей."""
 
     email = models.EmailField(
@@ -18,6 +20,15 @@ class User(AbstractUser):
     avatar = models.ImageField(
         upload_to='users/', null=True, default=None
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов', default=0, editable=False
+    )
+
+    counter_fields = ('recipes_count',)
+    # Поля, которые выводятся в рецептах автора.
+    tracked_fields = (
+        'username', 'first_name', 'last_name', 'email', 'avatar'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username',)